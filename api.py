@@ -0,0 +1,199 @@
+"""Headless JSON API for logging and reading Study Companion data from other clients.
+
+Runs next to the Streamlit app on the same database:
+
+    python api.py --port 8502
+
+GET responses carry an ETag; clients that send it back in If-None-Match get
+an empty 304 when nothing changed.
+"""
+import argparse
+import datetime
+import json
+from concurrent.futures import ThreadPoolExecutor
+
+import tornado.ioloop
+import tornado.web
+
+from utils.storage import backend_from_url, database_url, set_backend, get_backend, days_ago
+from utils.moods import describe_mood, log_mood
+from utils.streaks import complete_habit, get_streak_engine
+from utils.schedule import load_schedule_summary
+from utils.archive import table_source
+
+# Blocking database calls run on these threads (each keeps its own connection open).
+DB_THREADS = 4
+_db_executor = ThreadPoolExecutor(max_workers=DB_THREADS, thread_name_prefix="db")
+
+
+async def run_db(fn, *args):
+    """Runs a blocking database function without stalling the event loop."""
+    return await tornado.ioloop.IOLoop.current().run_in_executor(_db_executor, fn, *args)
+
+
+# --- QUERIES ---
+def mood_logs(days):
+    since = days_ago(days)
+    df = get_backend().read_sql(
+        f"SELECT id, date, logged_at, mood_rating, mood_label, mood_emoji, journal_entry FROM {table_source('mood_logs', since)} WHERE date >= ? ORDER BY date DESC, logged_at DESC, id DESC",
+        params=(since,)
+    )
+    # NULL columns (e.g. `logged_at` on rows from before it existed) become null, not NaN.
+    df['logged_at'] = df['logged_at'].astype('Int64')
+    return df.astype(object).where(df.notna(), None).to_dict(orient='records')
+
+
+def habits_today():
+    backend = get_backend()
+    df_habits = backend.read_sql("SELECT id, name FROM habits ORDER BY id")
+    done = set(backend.read_sql("SELECT habit_id FROM habit_completions WHERE date = ?",
+                                params=(datetime.date.today().isoformat(),))['habit_id'])
+    engine = get_streak_engine()
+    return [
+        {'id': int(habit_id), 'name': name, 'completed_today': habit_id in done, **engine.habit_stats(habit_id)}
+        for habit_id, name in df_habits.itertuples(index=False)
+    ]
+
+
+def habit_exists(habit_id):
+    return not get_backend().read_sql("SELECT id FROM habits WHERE id = ?", params=(habit_id,)).empty
+
+
+def schedule():
+    summary = load_schedule_summary()
+    if summary is None:
+        return {'days': {}, 'subjects': {}}
+    day_totals, subject_totals = summary
+    days = {}
+    for day, subject, hours in day_totals[['day', 'subject', 'hours']].itertuples(index=False):
+        days.setdefault(day, []).append({'subject': subject, 'hours': hours})
+    return {'days': days, 'subjects': dict(zip(subject_totals['subject'], subject_totals['hours']))}
+
+
+def dashboard(days):
+    backend = get_backend()
+    since = days_ago(days)
+    study = backend.read_sql(
+        f"SELECT subject, SUM(duration_minutes) AS minutes FROM {table_source('study_sessions', since)} WHERE date >= ? GROUP BY subject",
+        params=(since,)
+    )
+    mood = backend.read_sql(f"SELECT AVG(mood_rating) AS avg, COUNT(*) AS n FROM {table_source('mood_logs', since)} WHERE date >= ?", params=(since,))
+    habits = backend.read_sql(f"""
+        SELECT h.name, COUNT(hc.id) AS count
+        FROM habits h
+        LEFT JOIN {table_source('habit_completions', since, alias='hc')} ON hc.habit_id = h.id AND hc.date >= ?
+        GROUP BY h.name
+    """, params=(since,))
+    hours_by_subject = {subject: round(float(minutes) / 60, 2) for subject, minutes in study.itertuples(index=False)}
+    average_mood = mood['avg'].iloc[0]
+    return {
+        'days': days,
+        'total_study_hours': round(float(sum(hours_by_subject.values())), 2),
+        'study_hours_by_subject': hours_by_subject,
+        'average_mood': None if average_mood is None else round(float(average_mood), 1),
+        'mood_logs': int(mood['n'].iloc[0]),
+        'habit_completions': dict(zip(habits['name'], habits['count'].astype(int).tolist())),
+    }
+
+
+# --- HANDLERS ---
+class JSONHandler(tornado.web.RequestHandler):
+    """Base handler: JSON in and out. Tornado adds the ETag and answers If-None-Match with 304."""
+
+    def set_default_headers(self):
+        self.set_header("Content-Type", "application/json; charset=UTF-8")
+        self.set_header("Cache-Control", "no-cache")  # always revalidate, using the ETag
+
+    def write_json(self, data, status=200):
+        self.set_status(status)
+        self.finish(json.dumps(data, default=str, allow_nan=False))
+
+    def json_body(self):
+        try:
+            body = json.loads(self.request.body or b"{}")
+        except ValueError:
+            raise tornado.web.HTTPError(400, reason="Request body must be JSON")
+        if not isinstance(body, dict):
+            raise tornado.web.HTTPError(400, reason="Request body must be a JSON object")
+        return body
+
+    def int_argument(self, name, default):
+        try:
+            return int(self.get_query_argument(name, default))
+        except ValueError:
+            raise tornado.web.HTTPError(400, reason=f"'{name}' must be an integer")
+
+    def write_error(self, status_code, **kwargs):
+        self.finish(json.dumps({'error': self._reason}))
+
+
+class MoodsHandler(JSONHandler):
+    async def get(self):
+        self.write_json(await run_db(mood_logs, self.int_argument('days', 30)))
+
+    async def post(self):
+        body = self.json_body()
+        rating = body.get('mood_rating')
+        if not isinstance(rating, int) or isinstance(rating, bool) or not 1 <= rating <= 10:
+            raise tornado.web.HTTPError(400, reason="'mood_rating' must be an integer from 1 to 10")
+        emoji, label = describe_mood(rating)
+        await run_db(log_mood, rating, label, emoji, body.get('journal_entry', ""))
+        self.write_json({'mood_rating': rating, 'mood_label': label, 'mood_emoji': emoji}, status=201)
+
+
+class HabitsHandler(JSONHandler):
+    async def get(self):
+        self.write_json(await run_db(habits_today))
+
+
+class HabitCompletionHandler(JSONHandler):
+    async def post(self, habit_id):
+        habit_id = int(habit_id)
+        date = self.json_body().get('date') or datetime.date.today().isoformat()
+        try:
+            date = datetime.date.fromisoformat(date).isoformat()
+        except (TypeError, ValueError):
+            raise tornado.web.HTTPError(400, reason="'date' must be YYYY-MM-DD")
+        if not await run_db(habit_exists, habit_id):
+            raise tornado.web.HTTPError(404, reason="No such habit")
+        try:
+            await run_db(complete_habit, habit_id, date)
+        except get_backend().IntegrityError:
+            raise tornado.web.HTTPError(409, reason="Habit already completed on that date")
+        self.write_json({'habit_id': habit_id, 'date': date}, status=201)
+
+
+class ScheduleHandler(JSONHandler):
+    async def get(self):
+        self.write_json(await run_db(schedule))
+
+
+class DashboardHandler(JSONHandler):
+    async def get(self):
+        self.write_json(await run_db(dashboard, self.int_argument('days', 7)))
+
+
+def make_app():
+    return tornado.web.Application([
+        (r"/api/moods", MoodsHandler),
+        (r"/api/habits", HabitsHandler),
+        (r"/api/habits/(\d+)/completions", HabitCompletionHandler),
+        (r"/api/schedule", ScheduleHandler),
+        (r"/api/dashboard", DashboardHandler),
+    ])
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Study Companion JSON API")
+    parser.add_argument("--address", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8502)
+    args = parser.parse_args()
+
+    set_backend(backend_from_url(database_url(), reuse_connections=True))
+    make_app().listen(args.port, address=args.address)
+    print(f"Study Companion API listening on http://{args.address}:{args.port}/api")
+    tornado.ioloop.IOLoop.current().start()
+
+
+if __name__ == "__main__":
+    main()
@@ -1,99 +1,86 @@
 import streamlit as st
-import pandas as pd
 import random
 import datetime
 import plotly.express as px
-import sqlite3
-
-# --- DATABASE FUNCTIONS ---
-def get_db_connection():
-    """Establishes a connection to the SQLite database."""
-    conn = sqlite3.connect('study_companion.db')
-    return conn
-
-def create_tables():
-    """Creates the necessary tables in the database if they do not exist."""
-    conn = sqlite3.connect('study_companion.db')
-    c = conn.cursor()
-    c.execute('''
-        CREATE TABLE IF NOT EXISTS mood_logs (
-            id INTEGER PRIMARY KEY,
-            date TEXT NOT NULL,
-            mood_rating INTEGER,
-            journal_entry TEXT
-        )
-    ''')
-    c.execute('''
-        CREATE TABLE IF NOT EXISTS habits (
-            id INTEGER PRIMARY KEY,
-            name TEXT NOT NULL UNIQUE
-        )
-    ''')
-    c.execute('''
-        CREATE TABLE IF NOT EXISTS habit_completions (
-            id INTEGER PRIMARY KEY,
-            habit_id INTEGER NOT NULL,
-            date TEXT NOT NULL,
-            FOREIGN KEY (habit_id) REFERENCES habits(id)
-        )
-    ''')
-    
-    c.execute('''
-        CREATE TABLE IF NOT EXISTS study_sessions (
-            id INTEGER PRIMARY KEY,
-            date TEXT NOT NULL,
-            subject TEXT NOT NULL,
-            duration_minutes INTEGER,
-            notes TEXT
-        )
-    ''')
-
-    conn.commit()
-    conn.close()
-
-# --- CALLBACK FUNCTION TO SAVE SCHEDULE ---
+from utils.moods import load_latest_mood
+from utils.slots import slot_stats, recommend_slots
+from utils.changes import changed_tables
+from utils.live import refresh_versions, live_read_sql, watch_tables
+from utils.review import REVIEW_PREFIX, load_subjects, save_subject, weekly_review_hours, due_count
+from utils.schedule import DAYS, save_schedule, summarize_schedule, load_schedule_summary, schedule_from_day_totals
+from utils.backup import snapshot_before_save, undo_save
+
+# --- CALLBACK FUNCTIONS ---
 def save_schedule_to_db():
     """Saves the generated schedule from session state to the database."""
     if st.session_state.generated_schedule:
-        conn = get_db_connection()
-        c = conn.cursor()
-        
-        # Clear previous saved schedule to avoid duplicates
-        c.execute("DELETE FROM study_sessions")
-        conn.commit()
-
-        # Get today's date and find the starting day of the week
-        today_date = datetime.date.today()
-        days_of_week = ["Monday", "Tuesday", "Wednesday", "Thursday", "Friday", "Saturday", "Sunday"]
-        
-        # Determine the date of the first day of the schedule (e.g., this Monday)
-        start_of_week = today_date - datetime.timedelta(days=today_date.weekday())
-        
-        # Iterate through the generated schedule and save to database
-        for i, day_name in enumerate(days_of_week):
-            current_date = start_of_week + datetime.timedelta(days=i)
-            sessions = st.session_state.generated_schedule.get(day_name, [])
-            for subj, hrs in sessions:
-                if subj not in ["Other Activities", "Free Time"]: # Don't save non-study tasks
-                    c.execute("INSERT INTO study_sessions (date, subject, duration_minutes, notes) VALUES (?, ?, ?, ?)",
-                              (current_date.strftime('%Y-%m-%d'), subj, int(hrs * 60), "")) # Convert hours to minutes
-        
-        conn.commit()
-        conn.close()
+        # Saving replaces all study sessions, so keep a snapshot to undo it with
+        st.session_state.undo_snapshot = snapshot_before_save()
+        st.session_state.schedule_summary = save_schedule(st.session_state.generated_schedule)
         st.success("Schedule saved successfully! Your dashboard will be updated.")
         st.session_state.schedule_saved = True # Set a flag to show success message
 
+def undo_last_save():
+    """Restores the study sessions and plan from before the last save."""
+    try:
+        undo_save(st.session_state.undo_snapshot)
+    except FileNotFoundError:
+        st.session_state.undo_snapshot = None
+        st.warning("That save can no longer be undone: its backup copy was already cleaned up.")
+        return
+    st.session_state.undo_snapshot = None
+    st.session_state.schedule_summary = load_schedule_summary()
+    if st.session_state.schedule_summary is not None:
+        st.session_state.generated_schedule = schedule_from_day_totals(st.session_state.schedule_summary[0])
+        st.session_state.schedule_saved = True
+    else:
+        st.session_state.generated_schedule = None
+        st.session_state.schedule_saved = False
+
+def generate_and_store_schedule():
+    """Generates a new weekly schedule and keeps it, with its summaries, in session state."""
+    today = datetime.date.today()
+    review_hours = weekly_review_hours(today - datetime.timedelta(days=today.weekday()), st.session_state.hours_per_day)
+    schedule = generate_weekly_schedule(st.session_state.subject_data, st.session_state.hours_per_day, review_hours)
+    st.session_state.generated_schedule = schedule
+    st.session_state.schedule_summary = summarize_schedule(schedule)
+    st.session_state.schedule_button_clicked = True
+    st.session_state.schedule_saved = False # Reset save flag
+
+@st.cache_data(max_entries=8, show_spinner=False)
+def build_subject_chart(chart_data):
+    """Builds the weekly hours-per-subject bar chart; an unchanged plan reuses the cached figure."""
+    fig = px.bar(
+        chart_data,
+        x="Subject",
+        y="Hours",
+        title="Total Hours per Subject (Weekly)",
+        height=500,
+        color_discrete_sequence=['#1f77b4']
+    )
+    fig.update_layout(
+        plot_bgcolor='rgba(0,0,0,0)',
+        paper_bgcolor='rgba(0,0,0,0)',
+        title_font_color="white",
+        font_color="white",
+        xaxis=dict(showgrid=False),
+        yaxis=dict(showgrid=True, gridcolor='#555555')
+    )
+    return fig
+
 
 # --- SCHEDULE GENERATOR LOGIC ---
-def generate_weekly_schedule(subject_difficulty: dict, hours_per_day: int):
+def generate_weekly_schedule(subject_difficulty: dict, hours_per_day: int, review_hours: dict = None):
     days = ["Monday", "Tuesday", "Wednesday", "Thursday", "Friday", "Saturday", "Sunday"]
     schedule = {day: [] for day in days}
 
     if not subject_difficulty:
         return schedule
 
+    # Spaced-repetition reviews ({day_index: {subject: hours}}) are booked first
+    review_hours = review_hours or {}
     total_difficulty = sum(subject_difficulty.values())
-    weekly_target = hours_per_day * 7
+    weekly_target = hours_per_day * 7 - sum(sum(r.values()) for r in review_hours.values())
 
     weekly_allocations = {
         subj: round(weekly_target * (diff / total_difficulty), 1)
@@ -104,8 +91,8 @@ def generate_weekly_schedule(subject_difficulty: dict, hours_per_day: int):
     hardest = max(subject_difficulty, key=subject_difficulty.get)
 
     for day in days:
-        todays_subjects = []
-        remaining = hours_per_day
+        todays_subjects = [(REVIEW_PREFIX + subj, hrs) for subj, hrs in review_hours.get(days.index(day), {}).items()]
+        remaining = round(hours_per_day - sum(t[1] for t in todays_subjects), 1)
 
         subjects_today = list(subject_difficulty.keys())
         random.shuffle(subjects_today)
@@ -157,7 +144,6 @@ def generate_weekly_schedule(subject_difficulty: dict, hours_per_day: int):
 
 # --- UI FOR SCHEDULE PAGE ---
 st.set_page_config(page_title="Schedule", layout="wide")
-create_tables()
 
 # --- INITIALIZE SESSION STATE ---
 if 'generated_schedule' not in st.session_state:
@@ -165,7 +151,7 @@ if 'generated_schedule' not in st.session_state:
 if 'schedule_button_clicked' not in st.session_state:
     st.session_state.schedule_button_clicked = False
 if 'subject_data' not in st.session_state:
-    st.session_state.subject_data = {}
+    st.session_state.subject_data = load_subjects()
 if 'subj_name_input_value' not in st.session_state:
     st.session_state.subj_name_input_value = ""
 if 'hours_per_day' not in st.session_state:
@@ -174,6 +160,22 @@ if 'mood_is_bad' not in st.session_state:
     st.session_state.mood_is_bad = False
 if 'schedule_saved' not in st.session_state:
     st.session_state.schedule_saved = False
+if 'undo_snapshot' not in st.session_state:
+    st.session_state.undo_snapshot = None
+if 'schedule_summary' not in st.session_state:
+    # First visit: show the saved plan straight from its materialized summaries
+    st.session_state.schedule_summary = load_schedule_summary()
+    if st.session_state.schedule_summary is not None:
+        st.session_state.generated_schedule = schedule_from_day_totals(st.session_state.schedule_summary[0])
+        st.session_state.schedule_saved = True
+
+# A plan saved from another tab or session replaces the saved plan shown here (unsaved plans are kept).
+previous_versions = st.session_state.get('table_versions')
+current_versions = refresh_versions()
+if previous_versions and st.session_state.schedule_saved and changed_tables(previous_versions, current_versions, ['schedule_day_totals']):
+    st.session_state.schedule_summary = load_schedule_summary()
+    if st.session_state.schedule_summary is not None:
+        st.session_state.generated_schedule = schedule_from_day_totals(st.session_state.schedule_summary[0])
 
 
 # Use columns for a clean layout and place the save button on the right
@@ -187,6 +189,8 @@ with button_col:
     st.markdown("<br>", unsafe_allow_html=True)
     if st.session_state.generated_schedule is not None:
         st.button("Save Schedule", on_click=save_schedule_to_db)
+    if st.session_state.undo_snapshot:
+        st.button("↩️ Undo Save", on_click=undo_last_save, help="Bring back the study sessions from before the last save")
 
 st.write("Generate a weekly study plan based on your available hours and subject difficulties.")
 st.markdown("---")
@@ -203,6 +207,7 @@ with st.sidebar:
         add_btn = st.form_submit_button("Add Subject")
 
     if add_btn and subj_name:
+        save_subject(subj_name, diff_value)
         st.session_state.subject_data[subj_name] = diff_value
         st.session_state.schedule_button_clicked = False
         st.session_state.subj_name_input_value = ""
@@ -217,20 +222,23 @@ with st.sidebar:
             st.write(f"- **{subj}** (Difficulty: {st.session_state.subject_data[subj]})")
     else:
         st.info("No subjects added yet.")
+
+    cards_due = due_count()
+    if cards_due:
+        st.caption(f"🃏 {cards_due} flashcard(s) due — review time is booked into the generated plan.")
+
+    best_slots = recommend_slots(slot_stats(read_sql=live_read_sql))
+    if best_slots:
+        st.caption(f"⏰ Your best study times: {', '.join(best_slots)}")
     
     st.write("---")
-    if st.button("Generate New Schedule", disabled=not st.session_state.subject_data):
-        st.session_state.schedule_button_clicked = True
-        st.session_state.schedule_saved = False # Reset save flag
-        st.rerun()
+    st.button("Generate New Schedule", disabled=not st.session_state.subject_data, on_click=generate_and_store_schedule)
 
 
 # --- Main content for Schedule page ----
 
 # Check for the latest mood
-conn = get_db_connection()
-latest_mood = pd.read_sql_query("SELECT mood_rating FROM mood_logs ORDER BY date DESC LIMIT 1", conn)
-conn.close()
+latest_mood = load_latest_mood()
 
 if not latest_mood.empty and latest_mood['mood_rating'].iloc[0] < 4 and not st.session_state.schedule_button_clicked:
     st.session_state.mood_is_bad = True
@@ -245,16 +253,13 @@ if st.session_state.mood_is_bad:
     st.subheader("Suggested Habit: Take a 20-minute Walk 🚶")
     st.info("Mark this habit as complete in the 'Daily Trackers' tab and come back.")
     
-elif not st.session_state.schedule_button_clicked:
+elif st.session_state.generated_schedule is None:
     st.markdown("---")
     st.header("Ready to plan your week?")
     st.write("Click the button below to generate your first schedule.")
-    if st.button("Generate Schedule", disabled=not st.session_state.subject_data):
-        st.session_state.schedule_button_clicked = True
-        st.rerun()
+    st.button("Generate Schedule", disabled=not st.session_state.subject_data, on_click=generate_and_store_schedule)
 else:
-    schedule = generate_weekly_schedule(st.session_state.subject_data, st.session_state.hours_per_day)
-    st.session_state.generated_schedule = schedule
+    day_totals, subject_totals = st.session_state.schedule_summary
     
     if not latest_mood.empty:
         if latest_mood['mood_rating'].iloc[0] > 7:
@@ -263,48 +268,25 @@ else:
             st.info("Remember, a little progress each day adds up to big results. Let's plan it out!")
     
     today_idx = datetime.datetime.today().weekday()
-    days_ordered = list(schedule.keys())[today_idx:] + list(schedule.keys())[:today_idx]
+    days_ordered = DAYS[today_idx:] + DAYS[:today_idx]
     today_name = days_ordered[0]
 
     st.subheader("📊 Weekly Study Plan")
-    df_rows = []
-    for day in schedule:
-        row = {"Day": day}
-        for subj, hrs in schedule[day]:
-            row[subj] = row.get(subj, 0) + hrs
-        df_rows.append(row)
-    df = pd.DataFrame(df_rows).fillna(0)
-    df = df.set_index("Day").reindex(days_ordered).reset_index()
+    df = day_totals.pivot_table(index='day', columns='subject', values='hours', aggfunc='sum', fill_value=0)
+    df = df.reindex(days_ordered, fill_value=0).rename_axis(index="Day", columns=None).reset_index()
     st.dataframe(df, use_container_width=True)
 
     st.subheader(f"🗓️ Focus for Today: {today_name}")
-    today_tasks = schedule[today_name]
-    if today_tasks:
-        for subj, hrs in today_tasks:
+    today_tasks = day_totals[day_totals['day'] == today_name]
+    if not today_tasks.empty:
+        for subj, hrs in today_tasks[['subject', 'hours']].itertuples(index=False):
             st.markdown(f"- **{subj}** → {hrs} hrs")
     else:
         st.info("No subjects scheduled today. Full free time 🎉")
 
     st.subheader("📈 Weekly Time Distribution")
-    subject_totals = {}
-    for day in schedule:
-        for subj, hrs in schedule[day]:
-            subject_totals[subj] = subject_totals.get(subj, 0) + hrs
-    chart_data = pd.DataFrame(subject_totals.items(), columns=["Subject", "Hours"])
-    fig = px.bar(
-        chart_data,
-        x="Subject",
-        y="Hours",
-        title="Total Hours per Subject (Weekly)",
-        height=500,
-        color_discrete_sequence=['#1f77b4']
-    )
-    fig.update_layout(
-        plot_bgcolor='rgba(0,0,0,0)',
-        paper_bgcolor='rgba(0,0,0,0)',
-        title_font_color="white",
-        font_color="white",
-        xaxis=dict(showgrid=False),
-        yaxis=dict(showgrid=True, gridcolor='#555555')
-    )
-    st.plotly_chart(fig, use_container_width=True)
+    chart_data = subject_totals.rename(columns={'subject': 'Subject', 'hours': 'Hours'})
+    st.plotly_chart(build_subject_chart(chart_data), use_container_width=True)
+
+# Refresh when a mood is logged or a plan is saved in another tab or session.
+watch_tables(['mood_logs', 'schedule_day_totals'])
@@ -1,73 +1,77 @@
 import streamlit as st
 import pandas as pd
 import datetime
-import sqlite3
-import plotly.express as px
-
-# --- DATABASE FUNCTIONS ---
-def get_db_connection():
-    """Establishes a connection to the SQLite database."""
-    conn = sqlite3.connect('study_companion.db')
-    return conn
-
-def create_tables():
-    """Creates the necessary tables in the database if they do not exist."""
-    conn = get_db_connection()
-    c = conn.cursor()
-    c.execute('''
-        CREATE TABLE IF NOT EXISTS mood_logs (
-            id INTEGER PRIMARY KEY,
-            date TEXT NOT NULL,
-            mood_rating INTEGER,
-            mood_label TEXT,
-            mood_emoji TEXT,
-            journal_entry TEXT
+from utils.storage import get_backend
+from utils.streaks import get_streak_engine, complete_habit, save_habit_checklist
+from utils.charts import line_chart
+from utils.moods import describe_mood, log_mood
+from utils.archive import table_source
+
+# --- CHARTS ---
+@st.cache_data(max_entries=8, show_spinner=False)
+def build_mood_chart(df_mood):
+    """Builds the mood trend chart; identical data reuses the cached figure."""
+    return line_chart(df_mood, 'date', 'mood_rating', 'mean', title='Your Mood Over Time', markers=True)
+
+# --- HABIT CHECKLIST ---
+# Number of days (ending today) shown in the checklist, so missed days can be backfilled.
+CHECKLIST_DAYS = 7
+
+@st.fragment
+def habit_checklist():
+    """Habits x recent days grid; every tick is saved together in one transaction."""
+    st.subheader("Habit Checklist")
+    st.caption("Tick everything you did, including earlier days you forgot to log, then save once.")
+
+    backend = get_backend()
+    df_habits = backend.read_sql("SELECT id, name FROM habits ORDER BY id")
+    if df_habits.empty:
+        st.info("No habits added yet. Add some above!")
+        return
+
+    today = datetime.date.today()
+    days = [today - datetime.timedelta(days=i) for i in range(CHECKLIST_DAYS - 1, -1, -1)]
+    day_labels = {d.isoformat(): ("Today" if d == today else d.strftime("%a %d")) for d in days}
+    df_done = backend.read_sql("SELECT habit_id, date FROM habit_completions WHERE date >= ?", params=(days[0].isoformat(),))
+
+    before = pd.DataFrame(False, index=df_habits['id'], columns=list(day_labels))
+    for habit_id, date in df_done.itertuples(index=False):
+        if habit_id in before.index and date in before.columns:
+            before.loc[habit_id, date] = True
+    grid = before.copy()
+    grid.insert(0, 'Habit', df_habits['name'].values)
+
+    if 'checklist_version' not in st.session_state:
+        st.session_state.checklist_version = 0
+    if 'checklist_message' in st.session_state:
+        st.success(st.session_state.pop('checklist_message'))
+
+    with st.form(key='habit_checklist_form'):
+        edited = st.data_editor(
+            grid,
+            key=f"habit_checklist_{st.session_state.checklist_version}",
+            hide_index=True,
+            disabled=['Habit'],
+            use_container_width=True,
+            column_config={iso: st.column_config.CheckboxColumn(label) for iso, label in day_labels.items()}
         )
-    ''')
-    c.execute('''
-        CREATE TABLE IF NOT EXISTS habits (
-            id INTEGER PRIMARY KEY,
-            name TEXT NOT NULL UNIQUE
-        )
-    ''')
-    c.execute('''
-        CREATE TABLE IF NOT EXISTS habit_completions (
-            id INTEGER PRIMARY KEY,
-            habit_id INTEGER NOT NULL,
-            date TEXT NOT NULL,
-            FOREIGN KEY (habit_id) REFERENCES habits(id)
-        )
-    ''')
-    c.execute('''
-        CREATE TABLE IF NOT EXISTS study_sessions (
-            id INTEGER PRIMARY KEY,
-            date TEXT NOT NULL,
-            subject TEXT NOT NULL,
-            duration_minutes INTEGER,
-            notes TEXT
-        )
-    ''')
-    conn.commit()
-    conn.close()
-
-def log_mood(mood_rating, mood_label, mood_emoji, journal_entry):
-    """Logs the user's mood to the database."""
-    conn = get_db_connection()
-    c = conn.cursor()
-    c.execute(
-        "INSERT INTO mood_logs (date, mood_rating, mood_label, mood_emoji, journal_entry) VALUES (?, ?, ?, ?, ?)",
-        (datetime.date.today().isoformat(), mood_rating, mood_label, mood_emoji, journal_entry)
-    )
-    conn.commit()
-    conn.close()
+        submitted = st.form_submit_button("Save Check-offs")
+
+    if submitted:
+        after = edited[list(day_labels)].astype(bool)
+        ticked = (after & ~before).stack()
+        unticked = (before & ~after).stack()
+        added, removed = save_habit_checklist(ticked[ticked].index, unticked[unticked].index)
+        st.session_state.checklist_version += 1 # Redraw the grid from the saved state
+        st.session_state.checklist_message = f"✅ Saved {added} check-off(s)" + (f" and cleared {removed}." if removed else ".")
+        st.rerun(scope="fragment")
 
 # --- UI FOR DAILY TRACKERS PAGE ---
 st.set_page_config(page_title="Daily Trackers", layout="wide")
 st.title("😊✅ Daily Tracking")
 st.write("Log your mood and track your habits to see how they influence your study schedule.")
 
-# Ensure tables are created when the app starts
-create_tables()
+backend = get_backend()
 
 # Create tabs for the layout
 tab_mood, tab_habits = st.tabs(["😊 Mood Log", "✅ Habit Tracker"])
@@ -80,18 +84,7 @@ with tab_mood:
     mood_value = st.slider("How are you feeling today?", 1, 10, 5)
 
     # Map slider value → Emoji + Label
-    if mood_value <= 2:
-        mood_emoji, mood_label = "😢", "Very Sad"
-    elif mood_value <= 4:
-        mood_emoji, mood_label = "😞", "Sad"
-    elif mood_value <= 6:
-        mood_emoji, mood_label = "😐", "Neutral"
-    elif mood_value <= 8:
-        mood_emoji, mood_label = "🙂", "Happy"
-    elif mood_value == 9:
-        mood_emoji, mood_label = "😄", "Very Happy"
-    else:  # mood_value == 10
-        mood_emoji, mood_label = "🤩", "Excited"
+    mood_emoji, mood_label = describe_mood(mood_value)
 
     st.markdown(f"### Your mood: {mood_emoji} {mood_label} ({mood_value}/10)")
 
@@ -106,13 +99,14 @@ with tab_mood:
 
     # Mood Trends Chart
     st.subheader("Mood Trends (Past 7 Days)")
-    conn = get_db_connection()
-    df_mood = pd.read_sql_query("SELECT date, mood_rating FROM mood_logs ORDER BY date DESC LIMIT 7", conn)
-    conn.close()
+    df_mood = backend.read_sql("SELECT date, mood_rating FROM mood_logs ORDER BY date DESC LIMIT 7")
+    if len(df_mood) < 7:
+        # Too few recent logs: include the archive so the chart isn't left empty.
+        df_mood = backend.read_sql(f"SELECT date, mood_rating FROM {table_source('mood_logs')} ORDER BY date DESC LIMIT 7")
     
     if not df_mood.empty:
-        df_mood = df_mood.sort_values("date")
-        fig = px.line(df_mood, x='date', y='mood_rating', title='Your Mood Over Time', markers=True)
+        df_mood['date'] = pd.to_datetime(df_mood['date'])
+        fig = build_mood_chart(df_mood)
         st.plotly_chart(fig)
     else:
         st.info("No mood data yet. Log your mood to see trends!")
@@ -124,43 +118,46 @@ with tab_habits:
         new_habit_name = st.text_input("Add a new habit:")
         add_habit_button = st.form_submit_button(label='Add Habit')
         if add_habit_button and new_habit_name:
-            conn = get_db_connection()
-            c = conn.cursor()
             try:
-                c.execute("INSERT INTO habits (name) VALUES (?)", (new_habit_name,))
-                conn.commit()
+                backend.execute("INSERT INTO habits (name) VALUES (?)", (new_habit_name,))
                 st.success(f"Habit '{new_habit_name}' added!")
-            except sqlite3.IntegrityError:
+            except backend.IntegrityError:
                 st.warning("Habit already exists.")
-            conn.close()
 
     st.markdown("---")
-    st.subheader("Today's Habits")
-    conn = get_db_connection()
-    df_habits = pd.read_sql_query("SELECT id, name FROM habits", conn)
-    df_completions = pd.read_sql_query("SELECT habit_id, date FROM habit_completions WHERE date = ?", conn, params=(datetime.date.today().strftime('%Y-%m-%d'),))
-    conn.close()
-
-    if not df_habits.empty:
-        for index, row in df_habits.iterrows():
-            habit_id = row['id']
-            habit_name = row['name']
-            
-            completed_today = habit_id in df_completions['habit_id'].values
-            
-            if completed_today:
-                st.success(f"✔️ {habit_name} - Completed Today!")
-            else:
-                if st.button(f"Mark as Complete: {habit_name}", key=f"complete_{habit_id}"):
-                    conn = get_db_connection()
-                    c = conn.cursor()
-                    try:
-                        c.execute("INSERT INTO habit_completions (habit_id, date) VALUES (?, ?)", (habit_id, datetime.date.today().strftime('%Y-%m-%d')))
-                        conn.commit()
-                        st.success(f"Habit '{habit_name}' marked as complete!")
-                        st.rerun()
-                    except sqlite3.IntegrityError:
-                        st.info(f"You already completed '{habit_name}' today.")
-                    conn.close()
+    view_mode = st.radio("View:", ["Today's Habits", "Checklist"], horizontal=True, label_visibility="collapsed")
+
+    if view_mode == "Checklist":
+        habit_checklist()
     else:
-        st.info("No habits added yet. Add some above!")
\ No newline at end of file
+        st.subheader("Today's Habits")
+        df_habits = backend.read_sql("SELECT id, name FROM habits")
+        df_completions = backend.read_sql("SELECT habit_id, date FROM habit_completions WHERE date = ?", params=(datetime.date.today().strftime('%Y-%m-%d'),))
+
+        if not df_habits.empty:
+            df_streaks = get_streak_engine().stats(df_habits['id'])
+            for index, row in df_habits.iterrows():
+                habit_id = row['id']
+                habit_name = row['name']
+
+                completed_today = habit_id in df_completions['habit_id'].values
+
+                if completed_today:
+                    st.success(f"✔️ {habit_name} - Completed Today!")
+                else:
+                    if st.button(f"Mark as Complete: {habit_name}", key=f"complete_{habit_id}"):
+                        try:
+                            complete_habit(habit_id, datetime.date.today())
+                            st.success(f"Habit '{habit_name}' marked as complete!")
+                            st.rerun()
+                        except backend.IntegrityError:
+                            st.info(f"You already completed '{habit_name}' today.")
+
+                streak = df_streaks.loc[habit_id]
+                st.caption(
+                    f"🔥 Current streak: {int(streak['current_streak'])} day(s) · "
+                    f"Longest: {int(streak['longest_streak'])} day(s) · "
+                    f"Last 7 days: {streak['rate_7d']:.0%} · Last 30 days: {streak['rate_30d']:.0%}"
+                )
+        else:
+            st.info("No habits added yet. Add some above!")
\ No newline at end of file
@@ -1,42 +1,31 @@
 import streamlit as st
 import pandas as pd
-import sqlite3
 import plotly.express as px
 import datetime
-import random
-
-# --- DATABASE CONNECTION ---
-def get_db_connection():
-    """Establishes a connection to the SQLite database."""
-    conn = sqlite3.connect('study_companion.db')
-    return conn
-
-# --- AI-POWERED INSIGHTS ---
-def generate_ai_insight(df_mood, df_habits, df_completions):
-    """Generates a personalized insight based on mood and habit data."""
-    
-    # Get the latest mood rating
-    latest_mood = df_mood['mood_rating'].iloc[0] if not df_mood.empty else 0
-    
-    # Get a list of all habits
-    habits = df_habits['name'].tolist() if not df_habits.empty else []
-
-    if latest_mood >= 8:
-        return f"You're doing great with a mood of {latest_mood}/10! Keep up the good work and stay positive."
-    elif latest_mood >= 4:
-        motivational_quotes = [
-            "The secret of getting ahead is getting started.",
-            "The best way to predict the future is to create it.",
-            "Don't watch the clock; do what it does. Keep going.",
-            "The future belongs to those who believe in the beauty of their dreams."
-        ]
-        return f"It looks like your mood is a bit low today at {latest_mood}/10. Here's some motivation: '{random.choice(motivational_quotes)}'"
-    else:
-        if habits:
-            suggested_habit = random.choice(habits)
-            return f"Your mood is quite low today. Your Smart Companion suggests focusing on a habit to feel better. How about '{suggested_habit}'?"
-        else:
-            return "Your mood is quite low today. Please add a habit in the Daily Tracker page to get a suggestion."
+from utils.storage import get_backend, days_ago
+from utils.streaks import get_streak_engine
+from utils.charts import year_heatmap, line_chart
+from utils.archive import table_source
+from utils.live import refresh_versions, versions_of, live_read_sql, watch_tables
+from utils.insights import generate_ai_insight
+from utils.summaries import study_hours_by_subject, study_hours_by_date, habit_counts
+from utils.moods import load_latest_mood
+from utils.slots import slot_stats, recommend_slots, slot_heatmap
+
+# --- CHARTS ---
+@st.cache_data(max_entries=16, show_spinner=False)
+def build_line_chart(df, x, y, how, labels, color, y_title):
+    """Builds a downsampled line chart; identical data reuses the cached figure."""
+    fig = line_chart(df, x, y, how, labels=labels, color_discrete_sequence=[color])
+    fig.update_layout(xaxis_title="", yaxis_title=y_title)
+    return fig
+
+HEATMAP_TABLES = {'study': 'study_sessions', 'mood': 'mood_logs', 'habit': 'habit_completions'}
+
+@st.cache_data(max_entries=16, show_spinner=False)
+def build_year_heatmap(metric, habit_id, version, end):
+    """Builds a year heatmap ending on `end`; it is rebuilt only when its table's `version` or the day changes."""
+    return year_heatmap(get_backend(), metric, habit_id=habit_id, end=end)
 
 # --- PAGE CONFIGURATION ---
 st.set_page_config(page_title="Dashboard", layout="wide")
@@ -78,56 +67,61 @@ st.markdown("""
 """, unsafe_allow_html=True)
 
 
-# Use columns to place the title and select box side by side
-title_col, select_col = st.columns([4, 1])
-
-with title_col:
-    st.title("📊 Your Study Dashboard")
+TIME_FRAMES = {
+    'Last 7 Days': 7,
+    'Last 30 Days': 30,
+    'Last 90 Days': 90,
+    'Last Year': 365,
+    'Last 5 Years': 5 * 365,
+}
 
-with select_col:
-    st.markdown("<br>", unsafe_allow_html=True) # Add some spacing for alignment
+def select_time_frame(key):
+    """Time frame picker for one section; returns the label and the first date it covers."""
     time_frame = st.selectbox(
         "Select Time Frame:",
-        ('Last 7 Days', 'Last 30 Days'),
+        tuple(TIME_FRAMES),
+        key=key,
         label_visibility="collapsed" # Hides the label for a cleaner look
     )
+    return time_frame, days_ago(TIME_FRAMES[time_frame])
 
-if time_frame == 'Last 7 Days':
-    time_delta = '-7 days'
-else:
-    time_delta = '-30 days'
+def metric_card(title, value):
+    """Renders one of the Dashboard's metric cards."""
+    st.markdown(
+        f"""
+        <div class="metric-card">
+            <div class="metric-title">{title}</div>
+            <div class="metric-value">{value}</div>
+        </div>
+        """,
+        unsafe_allow_html=True
+    )
 
-st.write("An organized overview of your well-being, habits, and study progress.")
+# --- DASHBOARD SECTIONS ---
+# Each section is a fragment: interacting with its own inputs reruns only that section.
+@st.fragment
+def study_breakdown_section():
+    header_col, select_col = st.columns([4, 1])
+    with header_col:
+        st.header("Study Effort Breakdown")
+    with select_col:
+        time_frame, since_date = select_time_frame('study_time_frame')
 
-# --- STUDY TIME ANALYSIS ---
-with st.container():
-    st.header("Study Effort Breakdown")
+    df_study = live_read_sql(['study_sessions'], f"SELECT date, subject, duration_minutes FROM {table_source('study_sessions', since_date)} WHERE date >= ? ORDER BY date", params=(since_date,))
+    df_study['duration_hours'] = df_study['duration_minutes'] / 60
     col3, col4 = st.columns(2)
 
     with col3:
         st.subheader("Study Time by Subject")
-        conn = get_db_connection()
-        df_study = pd.read_sql_query(f"SELECT date, subject, duration_minutes FROM study_sessions WHERE date >= date('now', '{time_delta}') ORDER BY date", conn)
-        conn.close()
-
         if not df_study.empty:
-            df_study['duration_hours'] = df_study['duration_minutes'] / 60
-            study_by_subject = df_study.groupby('subject')['duration_hours'].sum().reset_index()
+            study_by_subject = study_hours_by_subject(df_study)
             
             # Find the most studied subject
             top_subject_row = study_by_subject.loc[study_by_subject['duration_hours'].idxmax()]
             top_subject_name = top_subject_row['subject']
             top_subject_hours = top_subject_row['duration_hours']
 
-            st.markdown(
-                f"""
-                <div class="metric-card">
-                    <div class="metric-title">Most Studied Subject ({time_frame})</div>
-                    <div class="metric-value">{top_subject_name} ({top_subject_hours:.1f} hrs)</div>
-                </div>
-                """,
-                unsafe_allow_html=True
-            )
+            metric_card(f"Most Studied Subject ({time_frame})", f"{top_subject_name} ({top_subject_hours:.1f} hrs)")
             fig_subjects = px.pie(study_by_subject, values='duration_hours', names='subject',
                                   hole=.3,
                                   color_discrete_sequence=px.colors.sequential.RdBu)
@@ -137,106 +131,165 @@ with st.container():
 
     with col4:
         st.subheader("Study Time Over Time")
-        conn = get_db_connection()
-        df_study = pd.read_sql_query(f"SELECT date, subject, duration_minutes FROM study_sessions WHERE date >= date('now', '{time_delta}') ORDER BY date", conn)
-        conn.close()
-        
         if not df_study.empty:
-            df_study['duration_hours'] = df_study['duration_minutes'] / 60
             total_hours = df_study['duration_hours'].sum()
-            st.markdown(
-                f"""
-                <div class="metric-card">
-                    <div class="metric-title">Total Hours Studied ({time_frame})</div>
-                    <div class="metric-value">{total_hours:.1f} hrs</div>
-                </div>
-                """,
-                unsafe_allow_html=True
-            )
-            df_study['date'] = pd.to_datetime(df_study['date'])
-            study_by_date = df_study.groupby('date')['duration_hours'].sum().reset_index()
-            fig_time = px.line(study_by_date, x='date', y='duration_hours',
-                               labels={'duration_hours': 'Hours Studied', 'date': 'Date'},
-                               color_discrete_sequence=['#5DADE2'])
-            fig_time.update_layout(
-                xaxis_title="", 
-                yaxis_title="Hours Studied"
-            )
+            metric_card(f"Total Hours Studied ({time_frame})", f"{total_hours:.1f} hrs")
+            study_by_date = study_hours_by_date(df_study)
+            fig_time = build_line_chart(study_by_date, 'date', 'duration_hours', 'sum',
+                                        {'duration_hours': 'Hours Studied', 'date': 'Date'},
+                                        '#5DADE2', "Hours Studied")
             st.plotly_chart(fig_time, use_container_width=True)
         else:
             st.info(f"Go to the 'Schedule' page to add your study time!")
 
+@st.fragment
+def mood_trends_section():
+    header_col, select_col = st.columns([3, 2])
+    with header_col:
+        st.subheader("Mood Over Time")
+    with select_col:
+        time_frame, since_date = select_time_frame('mood_time_frame')
+    df_mood_chart = live_read_sql(['mood_logs'], f"SELECT date, mood_rating FROM {table_source('mood_logs', since_date)} WHERE date >= ? ORDER BY date", params=(since_date,))
+
+    if not df_mood_chart.empty:
+        df_mood_chart['date'] = pd.to_datetime(df_mood_chart['date'])
+        average_mood = df_mood_chart['mood_rating'].mean().round(1)
+        metric_card(f"Average Mood ({time_frame})", f"{average_mood} / 10")
+        fig_mood = build_line_chart(df_mood_chart, 'date', 'mood_rating', 'mean',
+                                    {'mood_rating': 'Mood Rating', 'date': 'Date'},
+                                    '#FF6347', "Mood Rating (1-10)")
+        st.plotly_chart(fig_mood, use_container_width=True)
+    else:
+        st.info(f"No mood data yet for the {time_frame.lower()}. Log your mood to see your feelings!")
+
+@st.fragment
+def habit_completion_section():
+    header_col, select_col = st.columns([3, 2])
+    with header_col:
+        st.subheader("Habit Completion")
+    with select_col:
+        time_frame, since_date = select_time_frame('habit_time_frame')
+    df_habits = live_read_sql(['habits'], "SELECT id, name FROM habits")
+    df_completions = live_read_sql(['habit_completions'], f"SELECT habit_id, COUNT(date) as count FROM {table_source('habit_completions', since_date)} WHERE date >= ? GROUP BY habit_id", params=(since_date,))
+
+    if not df_habits.empty and not df_completions.empty:
+        df_merged = habit_counts(df_habits, df_completions)
+        if not df_merged.empty:
+            top_habit = df_merged.loc[df_merged['count'].idxmax()]
+            metric_card(f"Your Top Habit ({time_frame})", f"{top_habit['name']} ({int(top_habit['count'])}x)")
+        fig_habits = px.bar(df_merged, x='name', y='count',
+                            labels={'count': 'Times Completed', 'name': 'Habit'},
+                            color_discrete_sequence=['#4682B4'])
+        fig_habits.update_layout(xaxis_title="", yaxis_title="Times Completed")
+        st.plotly_chart(fig_habits, use_container_width=True)
+
+        st.markdown("**Habit Streaks**")
+        df_streaks = get_streak_engine().stats(df_habits['id'])
+        df_streaks.insert(0, 'Habit', df_habits.set_index('id')['name'])
+        st.dataframe(
+            df_streaks,
+            use_container_width=True,
+            hide_index=True,
+            column_config={
+                "current_streak": st.column_config.NumberColumn("Current Streak", format="%d 🔥"),
+                "longest_streak": st.column_config.NumberColumn("Longest Streak", format="%d"),
+                "rate_7d": st.column_config.ProgressColumn("Last 7 Days", min_value=0, max_value=1, format="percent"),
+                "rate_30d": st.column_config.ProgressColumn("Last 30 Days", min_value=0, max_value=1, format="percent"),
+            }
+        )
+    else:
+        st.info(f"No habits or completion data yet for the {time_frame.lower()}. Add some habits and get started!")
+
+@st.fragment
+def year_in_review_section():
+    st.header("📅 Year in Review")
+    habit_names = live_read_sql(['habits'], "SELECT id, name FROM habits")
+    heatmap_options = ["Study Minutes", "Mood"] + [f"Habit: {name}" for name in habit_names['name']]
+    heatmap_choice = st.selectbox("Show:", heatmap_options)
+
+    habit_id = None
+    if heatmap_choice == "Study Minutes":
+        metric = 'study'
+    elif heatmap_choice == "Mood":
+        metric = 'mood'
+    else:
+        metric = 'habit'
+        habit_id = int(habit_names['id'].iloc[heatmap_options.index(heatmap_choice) - 2])
+    fig_year = build_year_heatmap(metric, habit_id, versions_of(HEATMAP_TABLES[metric]), datetime.date.today())
+    st.plotly_chart(fig_year, use_container_width=True)
+
+@st.fragment
+def study_slots_section():
+    st.header("⏰ Best Study Times")
+    st.write("Your average mood by weekday and hour over the last 90 days.")
+    stats = slot_stats(read_sql=live_read_sql)
+    if stats.empty:
+        st.info("Log your mood at different times of day to discover when you feel best.")
+        return
+    best_slots = recommend_slots(stats)
+    if best_slots:
+        metric_card("Recommended Study Slots", ", ".join(best_slots))
+    st.plotly_chart(slot_heatmap(stats), use_container_width=True)
+
+@st.fragment
+def ai_insights_section():
+    st.header("🧠 AI-Powered Insights")
+    st.markdown("Here, your Smart Companion will analyze your data and give you personalized tips and recommendations.")
+
+    # Call the function to generate an insight
+    week_start, today_str = days_ago(7), datetime.date.today().isoformat()
+    df_mood_insight = load_latest_mood()
+    df_habits_insight = live_read_sql(['habits'], "SELECT * FROM habits")
+    df_completions_insight = live_read_sql(['habits', 'habit_completions'], f"""
+        SELECT h.name, COUNT(*) AS count
+        FROM {table_source('habit_completions', week_start, alias='hc')}
+        JOIN habits h ON hc.habit_id = h.id
+        WHERE hc.date >= ?
+        GROUP BY h.name
+    """, params=(week_start,))
+    mood_avg_7d = live_read_sql(['mood_logs'], f"SELECT AVG(mood_rating) AS avg FROM {table_source('mood_logs', week_start)} WHERE date >= ?", params=(week_start,))['avg'].iloc[0]
+    study_minutes_7d = live_read_sql(['study_sessions'], f"SELECT SUM(duration_minutes) AS minutes FROM {table_source('study_sessions', week_start)} WHERE date BETWEEN ? AND ?", params=(week_start, today_str))['minutes'].iloc[0]
+
+    with st.spinner("Thinking..."):
+        insight = generate_ai_insight(df_mood_insight, df_habits_insight, df_completions_insight,
+                                      mood_avg_7d if mood_avg_7d is not None else float('nan'),
+                                      (study_minutes_7d or 0) / 60)
+    st.info(insight)
+    st.button("🔄 Refresh Insight", key="refresh_insight")
+
+# --- PAGE LAYOUT ---
+st.title("📊 Your Study Dashboard")
+st.write("An organized overview of your well-being, habits, and study progress.")
+
+# One tiny query per run; cached reads below are only re-fetched for tables whose version moved.
+refresh_versions()
+
+# --- STUDY TIME ANALYSIS ---
+with st.container():
+    study_breakdown_section()
+
 # --- MOOD & HABIT DASHBOARD ---
 with st.container():
     st.header("Daily Trends")
     col1, col2 = st.columns(2)
 
     with col1:
-        st.subheader("Mood Over Time")
-        conn = get_db_connection()
-        df_mood_chart = pd.read_sql_query(f"SELECT date, mood_rating FROM mood_logs WHERE date >= date('now', '{time_delta}') ORDER BY date", conn)
-        conn.close()
-
-
-        if not df_mood_chart.empty:
-            df_mood_chart['date'] = pd.to_datetime(df_mood_chart['date'])
-            average_mood = df_mood_chart['mood_rating'].mean().round(1)
-            st.markdown(
-                f"""
-                <div class="metric-card">
-                    <div class="metric-title">Average Mood ({time_frame})</div>
-                    <div class="metric-value">{average_mood} / 10</div>
-                </div>
-                """,
-                unsafe_allow_html=True
-            )
-            fig_mood = px.line(df_mood_chart, x='date', y='mood_rating',
-                               labels={'mood_rating': 'Mood Rating', 'date': 'Date'},
-                               color_discrete_sequence=['#FF6347'])
-            fig_mood.update_layout(xaxis_title="", yaxis_title="Mood Rating (1-10)")
-            st.plotly_chart(fig_mood, use_container_width=True)
-        else:
-            st.info(f"No mood data yet for the {time_frame.lower()}. Log your mood to see your feelings!")
+        mood_trends_section()
 
     with col2:
-        st.subheader("Habit Completion")
-        conn = get_db_connection()
-        df_habits = pd.read_sql_query("SELECT id, name FROM habits", conn)
-        df_completions = pd.read_sql_query(f"SELECT habit_id, COUNT(date) as count FROM habit_completions WHERE date >= date('now', '{time_delta}') GROUP BY habit_id", conn)
-        conn.close()
-
-        if not df_habits.empty and not df_completions.empty:
-            df_merged = pd.merge(df_habits, df_completions, left_on='id', right_on='habit_id', how='left').fillna(0)
-            df_merged['count'] = df_merged['count'].astype(int)
-            if not df_merged.empty:
-                top_habit = df_merged.loc[df_merged['count'].idxmax()]
-                st.markdown(
-                    f"""
-                    <div class="metric-card">
-                        <div class="metric-title">Your Top Habit ({time_frame})</div>
-                        <div class="metric-value">{top_habit['name']} ({int(top_habit['count'])}x)</div>
-                    </div>
-                    """,
-                    unsafe_allow_html=True
-                )
-            fig_habits = px.bar(df_merged, x='name', y='count',
-                                labels={'count': 'Times Completed', 'name': 'Habit'},
-                                color_discrete_sequence=['#4682B4'])
-            fig_habits.update_layout(xaxis_title="", yaxis_title="Times Completed")
-            st.plotly_chart(fig_habits, use_container_width=True)
-        else:
-            st.info(f"No habits or completion data yet for the {time_frame.lower()}. Add some habits and get started!")
+        habit_completion_section()
+
+# --- YEAR IN REVIEW ---
+with st.container():
+    year_in_review_section()
+
+# --- TIME OF DAY ---
+with st.container():
+    study_slots_section()
 
 # --- AI-Powered Insights ---
 st.markdown("---")
-st.header("🧠 AI-Powered Insights")
-st.markdown("Here, your Smart Companion will analyze your data and give you personalized tips and recommendations.")
-
-# Call the function to generate an insight
-conn = get_db_connection()
-df_mood_insight = pd.read_sql_query("SELECT date, mood_rating, journal_entry FROM mood_logs ORDER BY date DESC LIMIT 1", conn)
-df_habits_insight = pd.read_sql_query("SELECT * FROM habits", conn)
-df_completions_insight = pd.read_sql_query("SELECT * FROM habit_completions", conn)
-conn.close()
+ai_insights_section()
 
-st.info(generate_ai_insight(df_mood_insight, df_habits_insight, df_completions_insight))
+# Refresh when moods, habits or study sessions change in another tab or session.
+watch_tables(['mood_logs', 'habits', 'habit_completions', 'study_sessions'])
@@ -0,0 +1,49 @@
+import streamlit as st
+from utils.review import load_subjects, subject_ids, add_card, due_cards, due_count, review_card
+
+# --- UI FOR REVIEW PAGE ---
+st.set_page_config(page_title="Review", layout="wide")
+st.title("🃏 Flashcard Review")
+st.write("Review your flashcards with spaced repetition: the better you remember a card, the longer until you see it again.")
+
+tab_review, tab_cards = st.tabs(["🔁 Due Today", "➕ Add Flashcards"])
+
+# ---- REVIEW TAB ----
+with tab_review:
+    cards_due = due_count()
+    st.header(f"Due Today ({cards_due})")
+
+    df_due = due_cards(limit=1)
+    if not df_due.empty:
+        card = df_due.iloc[0]
+        st.caption(f"{card['subject']}" + (f" · {card['topic']}" if card['topic'] else ""))
+        st.markdown(f"### {card['front']}")
+
+        if st.toggle("Show answer", key=f"show_{card['id']}"):
+            st.info(card['back'] or "(no answer written)")
+            st.write("How well did you remember it?")
+            grade_cols = st.columns(6)
+            grades = ["0 · Blackout", "1 · Wrong", "2 · Almost", "3 · Hard", "4 · Good", "5 · Easy"]
+            for quality, (col, label) in enumerate(zip(grade_cols, grades)):
+                with col:
+                    if st.button(label, key=f"grade_{card['id']}_{quality}", use_container_width=True):
+                        review_card(card['id'], quality)
+                        st.rerun()
+    else:
+        st.success("Nothing left to review today 🎉")
+
+# ---- ADD FLASHCARDS TAB ----
+with tab_cards:
+    st.header("Add a Flashcard")
+    subjects = load_subjects()
+    if subjects:
+        with st.form(key='add_card_form', clear_on_submit=True):
+            subject = st.selectbox("Subject", list(subjects))
+            topic = st.text_input("Topic (optional)")
+            front = st.text_area("Question")
+            back = st.text_area("Answer")
+            if st.form_submit_button("Add Flashcard") and front:
+                add_card(subject_ids()[subject], topic, front, back)
+                st.success("Flashcard added! It's due for review today.")
+    else:
+        st.info("Add subjects on the 'Schedule' page first.")
@@ -0,0 +1,78 @@
+"""Load test for the JSON API (api.py): reports requests/second and latency percentiles.
+
+    python api.py --port 8502 &
+    python scripts/load_test.py --concurrency 50 --requests 5000
+    python scripts/load_test.py --conditional          # revalidate with If-None-Match
+    python scripts/load_test.py --write-share 0.1      # mix in mood-logging writes
+"""
+import argparse
+import json
+import random
+import time
+
+import numpy as np
+from tornado.gen import multi
+from tornado.httpclient import AsyncHTTPClient, HTTPClientError, HTTPRequest
+from tornado.ioloop import IOLoop
+
+READ_PATHS = ["/api/dashboard", "/api/habits", "/api/schedule", "/api/moods?days=30"]
+
+
+def make_request(base_url, path, etags, conditional, write_share):
+    """Picks the next request: a write with probability `write_share`, otherwise a read."""
+    if random.random() < write_share:
+        body = {'mood_rating': random.randint(1, 10), 'journal_entry': "load test"}
+        return "POST /api/moods", HTTPRequest(base_url + "/api/moods", method="POST", body=json.dumps(body))
+    headers = {'If-None-Match': etags[path]} if conditional and path in etags else {}
+    return "GET " + path, HTTPRequest(base_url + path, headers=headers)
+
+
+async def worker(client, args, n_requests, etags, latencies, statuses):
+    for i in range(n_requests):
+        path = READ_PATHS[i % len(READ_PATHS)]
+        name, request = make_request(args.url, path, etags, args.conditional, args.write_share)
+        start = time.perf_counter()
+        try:
+            response = await client.fetch(request)
+            code = response.code
+            if "Etag" in response.headers:
+                etags[path] = response.headers["Etag"]
+        except HTTPClientError as e:
+            code = e.code  # 304 Not Modified and 4xx/5xx land here
+        latencies.append(time.perf_counter() - start)
+        statuses[name, code] = statuses.get((name, code), 0) + 1
+
+
+async def run(args):
+    client = AsyncHTTPClient(max_clients=args.concurrency)
+    etags, latencies, statuses = {}, [], {}
+    per_worker, extra = divmod(args.requests, args.concurrency)
+    start = time.perf_counter()
+    await multi([
+        worker(client, args, per_worker + (i < extra), etags, latencies, statuses)
+        for i in range(args.concurrency)
+    ])
+    elapsed = time.perf_counter() - start
+
+    ms = np.array(latencies) * 1000
+    print(f"{len(latencies)} requests in {elapsed:.2f}s with {args.concurrency} concurrent clients")
+    print(f"Throughput: {len(latencies) / elapsed:.1f} requests/second")
+    print(f"Latency (ms): p50 {np.percentile(ms, 50):.1f}  p95 {np.percentile(ms, 95):.1f}  "
+          f"p99 {np.percentile(ms, 99):.1f}  max {ms.max():.1f}")
+    for (name, code), count in sorted(statuses.items()):
+        print(f"  {name} -> {code}: {count}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load test the Study Companion API")
+    parser.add_argument("--url", default="http://127.0.0.1:8502", help="API base URL")
+    parser.add_argument("--concurrency", type=int, default=20, help="simultaneous clients")
+    parser.add_argument("--requests", type=int, default=2000, help="total requests to send")
+    parser.add_argument("--conditional", action="store_true", help="send If-None-Match with the last ETag seen")
+    parser.add_argument("--write-share", type=float, default=0.0, help="fraction of requests that log a mood")
+    args = parser.parse_args()
+    IOLoop.current().run_sync(lambda: run(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,15 @@
+import pytest
+
+from utils.storage import backend_from_url, set_backend
+from utils.streaks import reset_streak_engine
+
+
+@pytest.fixture
+def backend(tmp_path, monkeypatch):
+    """A fresh SQLite database in a temp dir, installed as the app's backend."""
+    monkeypatch.setenv("STUDY_COMPANION_BACKUP_DIR", str(tmp_path / "backups"))
+    reset_streak_engine()
+    backend = set_backend(backend_from_url(f"sqlite:///{tmp_path / 'study_companion.db'}"))
+    backend.executemany("INSERT INTO habits (name) VALUES (?)", [("read",), ("run",), ("sleep",)])
+    yield backend
+    reset_streak_engine()
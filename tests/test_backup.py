@@ -0,0 +1,65 @@
+import os
+import sqlite3
+import datetime
+
+import pytest
+
+from utils import backup
+from utils.moods import log_mood
+from utils.streaks import complete_habit
+
+# Bookkeeping tables that a restore rewrites on purpose.
+SKIPPED = {'table_versions', 'latest_mood', 'maintenance_runs'}
+
+
+def rows(backend):
+    conn = sqlite3.connect(backend.path)
+    try:
+        tables = [name for name, in conn.execute("SELECT name FROM sqlite_master WHERE type = 'table'") if name not in SKIPPED]
+        return {table: sorted(conn.execute(f"SELECT * FROM {table}").fetchall()) for table in tables}
+    finally:
+        conn.close()
+
+
+def test_full_then_delta_round_trip(backend):
+    full = backup.create_snapshot()
+    at_full = rows(backend)
+    log_mood(7, "Happy", "🙂", "first")
+    complete_habit(1, datetime.date.today())
+    delta = backup.create_snapshot()
+    at_delta = rows(backend)
+    assert not backup._is_delta(full) and backup._is_delta(delta)
+
+    backend.execute("INSERT INTO study_sessions (date, subject, duration_minutes) VALUES ('2026-01-01', 'Math', 30)")
+    backend.execute("DELETE FROM mood_logs")
+    backup.restore_snapshot(delta)
+    assert rows(backend) == at_delta
+    backup.restore_snapshot(full)
+    assert rows(backend) == at_full
+
+
+def test_delta_holds_only_changed_tables(backend):
+    backup.create_snapshot()
+    log_mood(5, "Okay", "😐", "")
+    conn = sqlite3.connect(backup.create_snapshot())
+    tables = {name for name, in conn.execute("SELECT name FROM sqlite_master WHERE type = 'table'")}
+    conn.close()
+    assert 'mood_logs' in tables
+    assert not tables & {'habits', 'habit_completions', 'study_sessions'}
+
+
+def test_pruning_keeps_the_base_of_kept_deltas(backend):
+    for i in range(2 * backup.FULL_EVERY):
+        log_mood(5, "Okay", "😐", str(i))
+        backup.create_snapshot(prune=False)
+    backup.prune_snapshots(keep=2)
+    history = backup._history()
+    assert not backup._is_delta(history[0][3])
+    backup.restore_snapshot(history[-1][3])
+
+
+def test_undo_of_a_pruned_copy_fails_cleanly(backend):
+    path = os.path.join(backup.undo_dir(), "undo-20260101T000000.000000.db")
+    with pytest.raises(FileNotFoundError):
+        backup.undo_save(path)
+    assert not os.path.exists(path)
@@ -0,0 +1,32 @@
+import datetime
+
+from utils.streaks import get_streak_engine, save_habit_checklist
+
+TODAY = datetime.date.today()
+YESTERDAY = TODAY - datetime.timedelta(days=1)
+
+
+def completions(backend):
+    df = backend.read_sql("SELECT habit_id, date FROM habit_completions")
+    return set(zip(df['habit_id'].astype(int), df['date']))
+
+
+def test_ticks_and_unticks_are_counted(backend):
+    assert save_habit_checklist([(1, TODAY), (1, YESTERDAY), (2, TODAY)]) == (3, 0)
+    assert save_habit_checklist([(3, TODAY)], [(1, YESTERDAY), (2, YESTERDAY)]) == (1, 1)
+    assert completions(backend) == {(1, TODAY.isoformat()), (2, TODAY.isoformat()), (3, TODAY.isoformat())}
+
+
+def test_saving_the_same_ticks_again_changes_nothing(backend):
+    save_habit_checklist([(1, TODAY), (1, YESTERDAY)])
+    assert save_habit_checklist([(1, TODAY), (1, YESTERDAY)]) == (0, 0)
+    assert get_streak_engine().habit_stats(1)['current_streak'] == 2
+
+
+def test_cell_logged_by_another_session_is_not_counted_twice(backend):
+    backend.execute("INSERT INTO habit_completions (habit_id, date) VALUES (1, ?)", (TODAY.isoformat(),))
+    assert save_habit_checklist([(1, TODAY), (1, YESTERDAY)]) == (1, 0)
+    # Unticking today must end the streak: a double-counted day would survive it.
+    assert save_habit_checklist([], [(1, TODAY)]) == (0, 1)
+    stats = get_streak_engine().habit_stats(1)
+    assert (stats['current_streak'], stats['longest_streak']) == (1, 1)
@@ -0,0 +1,76 @@
+import random
+import datetime
+
+from utils.streaks import get_streak_engine, complete_habit, delete_completion, update_completion_date
+
+BASE = datetime.date(2026, 1, 1)
+TODAY = BASE + datetime.timedelta(days=40)
+
+
+def recount(backend, habit_id, today=TODAY):
+    """Streak figures recomputed from scratch over the table."""
+    df = backend.read_sql("SELECT date FROM habit_completions WHERE habit_id = ?", params=(habit_id,))
+    days = {datetime.date.fromisoformat(d).toordinal() for d in df['date']}
+    longest = 0
+    for day in days:
+        if day - 1 not in days:
+            length = 0
+            while day + length in days:
+                length += 1
+            longest = max(longest, length)
+    current, day = 0, today.toordinal()
+    day = day if day in days else day - 1
+    while day in days:
+        current, day = current + 1, day - 1
+    done_7d = sum(1 for day in days if today.toordinal() - 6 <= day <= today.toordinal())
+    return current, longest, done_7d / 7
+
+
+def engine_figures(habit_id):
+    stats = get_streak_engine().habit_stats(habit_id, TODAY)
+    return stats['current_streak'], stats['longest_streak'], stats['rate_7d']
+
+
+def completion_ids(backend):
+    return backend.read_sql("SELECT id FROM habit_completions")['id'].tolist()
+
+
+def test_incremental_updates_match_a_full_recount(backend):
+    rng = random.Random(27)
+    for _ in range(300):
+        op = rng.random()
+        try:
+            if op < 0.45:
+                complete_habit(rng.randint(1, 3), BASE + datetime.timedelta(days=rng.randint(0, 45)))
+            elif op < 0.8 and completion_ids(backend):
+                delete_completion(rng.choice(completion_ids(backend)))
+            elif completion_ids(backend):
+                update_completion_date(rng.choice(completion_ids(backend)), BASE + datetime.timedelta(days=rng.randint(0, 45)))
+        except backend.IntegrityError:
+            pass  # already completed that day
+        for habit_id in (1, 2, 3):
+            assert engine_figures(habit_id) == recount(backend, habit_id)
+
+
+def test_engine_created_by_a_write_counts_it_once(backend):
+    complete_habit(1, TODAY)
+    assert engine_figures(1) == (1, 1, 1 / 7)
+    # Counted twice, the day would survive deleting its only row.
+    delete_completion(completion_ids(backend)[0])
+    assert engine_figures(1) == (0, 0, 0)
+
+
+def test_engine_reloads_after_a_write_it_was_not_told_about(backend):
+    complete_habit(1, TODAY)
+    engine = get_streak_engine()
+    # e.g. the JSON API process or another app node
+    backend.execute("INSERT INTO habit_completions (habit_id, date) VALUES (1, ?)", ((TODAY - datetime.timedelta(days=1)).isoformat(),))
+    assert get_streak_engine() is not engine
+    assert engine_figures(1) == recount(backend, 1) == (2, 2, 2 / 7)
+
+
+def test_own_writes_keep_the_engine(backend):
+    engine = get_streak_engine()
+    complete_habit(2, TODAY)
+    delete_completion(completion_ids(backend)[0])
+    assert get_streak_engine() is engine
@@ -0,0 +1,152 @@
+"""Hot/cold archival: old rows move to per-year partitions so the working tables stay small.
+
+    python -m utils.archive                 # archive rows older than the horizon, then VACUUM/ANALYZE
+    python -m utils.archive --days 180
+"""
+import os
+import argparse
+import datetime
+import threading
+
+from utils.storage import get_backend, days_ago
+
+# --- CONFIGURATION ---
+ARCHIVE_DAYS_ENV = "STUDY_COMPANION_ARCHIVE_DAYS"
+DEFAULT_ARCHIVE_DAYS = 365
+# Archival and VACUUM/ANALYZE run at most this often when scheduled from the app.
+MAINTENANCE_INTERVAL_DAYS = 7
+
+# Tables that are archived, with the columns copied to (and read back from) their partitions.
+ARCHIVED_TABLES = {
+    'mood_logs': ['id', 'date', 'mood_rating', 'mood_label', 'mood_emoji', 'journal_entry', 'logged_at'],
+    'habit_completions': ['id', 'habit_id', 'date', 'logged_at'],
+    'study_sessions': ['id', 'date', 'subject', 'duration_minutes', 'notes'],
+}
+
+
+def archive_days():
+    """Returns the configured horizon: rows older than this many days are archived."""
+    return int(os.environ.get(ARCHIVE_DAYS_ENV, DEFAULT_ARCHIVE_DAYS))
+
+
+def partition_name(table, year):
+    return f"{table}_{int(year)}"
+
+
+# --- READING ---
+def archive_partitions(table, start=None, end=None):
+    """Returns the archive partitions of `table` that may hold rows dated between `start` and `end`."""
+    query = "SELECT year FROM archive_partitions WHERE table_name = ?"
+    params = (table,)
+    if start is not None:
+        query += " AND max_date >= ?"
+        params += (str(start),)
+    if end is not None:
+        query += " AND year <= ?"
+        params += (int(str(end)[:4]),)
+    years = get_backend().read_sql(query + " ORDER BY year", params=params)['year']
+    return [partition_name(table, year) for year in years]
+
+
+def table_source(table, start=None, end=None, alias=None):
+    """FROM-clause source for `table` over a date window.
+
+    This is just the hot table unless the window reaches back into archived
+    years, in which case those partitions are unioned in (no window = all).
+    """
+    partitions = archive_partitions(table, start, end)
+    if not partitions:
+        return f"{table} AS {alias or table}"
+    return _union(table, [table] + partitions, alias)
+
+
+def archived_source(table, alias=None):
+    """FROM-clause source for only the archived rows of `table`, or None if none are archived."""
+    partitions = archive_partitions(table)
+    return _union(table, partitions, alias) if partitions else None
+
+
+def _union(table, names, alias):
+    columns = ", ".join(ARCHIVED_TABLES[table])
+    union = " UNION ALL ".join(f"SELECT {columns} FROM {name}" for name in names)
+    return f"({union}) AS {alias or table}"
+
+
+# --- ARCHIVING ---
+def archive_old_rows(days=None):
+    """Moves rows older than `days` into per-year partitions; returns the rows moved per table."""
+    cutoff = days_ago(archive_days() if days is None else days)
+    backend = get_backend()
+    moved = {}
+    for table, columns in ARCHIVED_TABLES.items():
+        columns = ", ".join(columns)
+        with backend.connection() as conn:
+            c = conn.cursor()
+            c.execute(backend.adapt(f"SELECT DISTINCT substr(date, 1, 4) FROM {table} WHERE date < ?"), (cutoff,))
+            years = sorted(int(year) for year, in c.fetchall())
+            moved[table] = 0
+            for year in years:
+                name = partition_name(table, year)
+                c.execute(f"CREATE TABLE IF NOT EXISTS {name} AS SELECT {columns} FROM {table} WHERE 1 = 0")
+                c.execute(f"CREATE INDEX IF NOT EXISTS idx_{name}_date ON {name} (date)")
+                c.execute(backend.adapt(f"INSERT INTO {name} ({columns}) SELECT {columns} FROM {table} WHERE date >= ? AND date < ?"),
+                          (f"{year}-01-01", min(cutoff, f"{year + 1}-01-01")))
+                moved[table] += c.rowcount
+                c.execute(f"SELECT MAX(date) FROM {name}")
+                c.execute(backend.adapt("""
+                    INSERT INTO archive_partitions (table_name, year, max_date) VALUES (?, ?, ?)
+                    ON CONFLICT (table_name, year) DO UPDATE SET max_date = excluded.max_date
+                """), (table, year, c.fetchone()[0]))
+            c.execute(backend.adapt(f"DELETE FROM {table} WHERE date < ?"), (cutoff,))
+    return moved
+
+
+# --- SCHEDULED MAINTENANCE ---
+def last_run(task):
+    df = get_backend().read_sql("SELECT last_run FROM maintenance_runs WHERE task = ?", params=(task,))
+    return None if df.empty else datetime.date.fromisoformat(df['last_run'].iloc[0])
+
+
+def _record_run(task):
+    get_backend().execute(
+        "INSERT INTO maintenance_runs (task, last_run) VALUES (?, ?) ON CONFLICT (task) DO UPDATE SET last_run = excluded.last_run",
+        (task, datetime.date.today().isoformat())
+    )
+
+
+def run_maintenance(days=None):
+    """Archives old rows, then VACUUMs and ANALYZEs so the space and planner stats follow."""
+    moved = archive_old_rows(days)
+    _record_run('archive')
+    get_backend().vacuum()
+    _record_run('vacuum')
+    return moved
+
+
+def maintenance_due(today=None):
+    today = today or datetime.date.today()
+    last = last_run('vacuum')
+    return last is None or (today - last).days >= MAINTENANCE_INTERVAL_DAYS
+
+
+_scheduled = False
+_scheduled_lock = threading.Lock()
+
+
+def schedule_maintenance():
+    """Starts `run_maintenance` in the background if it is due; checked once per process."""
+    global _scheduled
+    with _scheduled_lock:
+        if _scheduled:
+            return
+        _scheduled = True
+    if maintenance_due():
+        threading.Thread(target=run_maintenance, name="maintenance", daemon=True).start()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Archive old rows and VACUUM/ANALYZE the database")
+    parser.add_argument("--days", type=int, default=None, help=f"archive rows older than this (default: ${ARCHIVE_DAYS_ENV} or {DEFAULT_ARCHIVE_DAYS})")
+    args = parser.parse_args()
+    for table, count in run_maintenance(args.days).items():
+        print(f"{table}: archived {count} rows")
@@ -0,0 +1,521 @@
+"""Online snapshots of the SQLite database, with retention and point-in-time restore.
+
+    python -m utils.backup snapshot                    # take a snapshot now (skipped if nothing changed)
+    python -m utils.backup list
+    python -m utils.backup restore --at "2026-10-19 08:00"
+    python -m utils.backup benchmark --rows 1000000    # backup time and page latency on a synthetic database
+"""
+import os
+import re
+import time
+import random
+import shutil
+import sqlite3
+import datetime
+import tempfile
+import argparse
+import threading
+
+import numpy as np
+
+from utils.storage import SQLiteBackend, get_backend, set_backend, VERSIONED_TABLES
+
+# --- CONFIGURATION ---
+BACKUP_DIR_ENV = "STUDY_COMPANION_BACKUP_DIR"
+DEFAULT_BACKUP_DIR = "backups"
+# Number of snapshots kept in the point-in-time history; older ones are deleted
+# after each new snapshot. Labelled snapshots (e.g. "before-restore") and the
+# undo copies taken before schedule saves have budgets of their own.
+RETENTION = 30
+LABELLED_RETENTION = 5
+UNDO_RETENTION = 10
+# Every this many snapshots the history starts over with a full copy; the
+# ones in between only hold the tables that changed.
+FULL_EVERY = 7
+# Automatic snapshots are taken at most this often when scheduled from the app.
+BACKUP_INTERVAL_HOURS = 24
+# The backup copies this many pages per step and sleeps between steps, so
+# writers are only locked out for one short step at a time.
+PAGES_PER_STEP = 1024
+STEP_SLEEP = 0.005
+
+# Tables written by `save_schedule`, restored together to undo a save.
+SCHEDULE_TABLES = ['study_sessions', 'schedule_day_totals', 'schedule_subject_totals']
+
+_SNAPSHOT_NAME = re.compile(r"^(snapshot|delta)-(\d{8}T\d{6}\.\d{6})-v(\d+)(?:-([\w-]+))?\.db$")
+_UNDO_NAME = re.compile(r"^undo-\d{8}T\d{6}\.\d{6}\.db$")
+
+
+def backup_dir():
+    return os.environ.get(BACKUP_DIR_ENV, DEFAULT_BACKUP_DIR)
+
+
+def _sqlite_backend():
+    backend = get_backend()
+    if not isinstance(backend, SQLiteBackend):
+        raise RuntimeError("Snapshots use SQLite's backup API; back up PostgreSQL with pg_dump instead.")
+    return backend
+
+
+def _connect(backend):
+    # A private connection, so the backup never shares a transaction with the app.
+    return sqlite3.connect(backend.path, uri=backend.path.startswith("file:"))
+
+
+def _data_version(conn):
+    """Sum of all table versions; it grows with every write (see utils/changes.py)."""
+    return conn.execute("SELECT COALESCE(SUM(version), 0) FROM table_versions").fetchone()[0]
+
+
+# --- SNAPSHOTS ---
+# The history is a chain: a full copy, then deltas that hold only the tables
+# changed since the previous snapshot (per the version counters, or the row
+# count of an archive partition). Small tables without a change signal go
+# into every delta. Each snapshot records the state it saw in a manifest table.
+MANIFEST = "snapshot_manifest"
+SCHEMA_KEY = "__schema__"
+
+
+def _is_delta(path):
+    return os.path.basename(path).startswith("delta-")
+
+
+def list_snapshots():
+    """Returns the snapshots as (taken_at, data version, label, path), oldest first."""
+    directory = backup_dir()
+    if not os.path.isdir(directory):
+        return []
+    snapshots = []
+    for name in os.listdir(directory):
+        match = _SNAPSHOT_NAME.match(name)
+        path = os.path.join(directory, name)
+        if match and os.path.getsize(path) > 0:
+            taken_at = datetime.datetime.strptime(match.group(2), "%Y%m%dT%H%M%S.%f")
+            snapshots.append((taken_at, int(match.group(3)), match.group(4), path))
+    return sorted(snapshots)
+
+
+def _history():
+    """The unlabelled snapshots, i.e. the full/delta chain, oldest first."""
+    return [snapshot for snapshot in list_snapshots() if snapshot[2] is None]
+
+
+def _state(conn, schema):
+    """{table: state} of the tables with a change signal, plus the schema cookie."""
+    state = dict(conn.execute(f"SELECT table_name, version FROM {schema}.table_versions").fetchall())
+    for table, year in conn.execute(f"SELECT table_name, year FROM {schema}.archive_partitions").fetchall():
+        name = f"{table}_{int(year)}"
+        state[name] = conn.execute(f"SELECT COUNT(*) FROM {schema}.{name}").fetchone()[0]
+    state[SCHEMA_KEY] = conn.execute(f"PRAGMA {schema}.schema_version").fetchone()[0]
+    return state
+
+
+def _tables(conn, schema):
+    return [name for name, in conn.execute(f"SELECT name FROM {schema}.sqlite_master WHERE type = 'table' AND name NOT LIKE 'sqlite_%'")]
+
+
+def _read_manifest(path):
+    """The state recorded in a snapshot, or None for snapshots that predate manifests."""
+    conn = sqlite3.connect(path)
+    try:
+        return dict(conn.execute(f"SELECT table_name, state FROM {MANIFEST}").fetchall())
+    except sqlite3.OperationalError:
+        return None
+    finally:
+        conn.close()
+
+
+def _write_manifest(conn, schema, state):
+    conn.execute(f"CREATE TABLE {schema}.{MANIFEST} (table_name TEXT PRIMARY KEY, state INTEGER NOT NULL)")
+    conn.executemany(f"INSERT INTO {schema}.{MANIFEST} (table_name, state) VALUES (?, ?)", state.items())
+
+
+def _copy_tables(conn, path, tables, state=None):
+    """Copies `tables` of the live database into a new file in one read transaction.
+
+    With `state` (a previous manifest), only tables whose state differs from
+    it are copied, plus every table without a change signal; a manifest of
+    the current state is written alongside. Returns the tables copied.
+    """
+    conn.execute("ATTACH DATABASE ? AS snap", (path,))
+    try:
+        conn.execute("BEGIN")
+        if state is not None:
+            current = _state(conn, "main")
+            tables = [t for t in _tables(conn, "main") if t not in current or current[t] != state.get(t)]
+        for table in tables:
+            conn.execute(f"CREATE TABLE snap.{table} AS SELECT * FROM main.{table}")
+        if state is not None:
+            _write_manifest(conn, "snap", current)
+        conn.execute("COMMIT")
+    except Exception:
+        if conn.in_transaction:
+            conn.execute("ROLLBACK")
+        raise
+    finally:
+        conn.execute("DETACH DATABASE snap")
+    return tables
+
+
+def create_snapshot(label=None, force=False, prune=True, pages=PAGES_PER_STEP):
+    """Snapshots the live database without blocking readers; returns the snapshot's path.
+
+    An unlabelled snapshot is a delta of the tables changed since the previous
+    one, or a full copy every `FULL_EVERY` snapshots, when the schema changed
+    or when `force` is set. Unless `force` is set, returns the latest
+    snapshot's path instead when nothing changed. Labelled snapshots are always
+    full copies, kept outside the chain.
+    """
+    backend = _sqlite_backend()
+    os.makedirs(backup_dir(), exist_ok=True)
+    src = _connect(backend)
+    try:
+        version = _data_version(src)
+        latest = list_snapshots()
+        if latest and latest[-1][1] == version and not (force or label):
+            return latest[-1][3]
+        history = _history()
+        chain = 0
+        while chain < len(history) and _is_delta(history[-1 - chain][3]):
+            chain += 1
+        previous = _read_manifest(history[-1][3]) if history and not (force or label) and chain + 1 < FULL_EVERY else None
+        if previous is not None and previous.get(SCHEMA_KEY) != src.execute("PRAGMA schema_version").fetchone()[0]:
+            previous = None
+        taken_at = datetime.datetime.now().strftime("%Y%m%dT%H%M%S.%f")
+        kind = "snapshot" if previous is None else "delta"
+        name = f"{kind}-{taken_at}-v{version}" + (f"-{label}" if label else "") + ".db"
+        path = os.path.join(backup_dir(), name)
+        if previous is None:
+            dest = sqlite3.connect(path + ".part")
+            try:
+                src.backup(dest, pages=pages, sleep=STEP_SLEEP)
+                state = _state(dest, "main")
+                # The copy gets a schema cookie of its own; record the live one deltas compare with.
+                state[SCHEMA_KEY] = src.execute("PRAGMA schema_version").fetchone()[0]
+                _write_manifest(dest, "main", state)
+                dest.commit()
+            finally:
+                dest.close()
+        else:
+            src.isolation_level = None  # transactions are managed by _copy_tables
+            _copy_tables(src, path + ".part", None, previous)
+        os.replace(path + ".part", path)  # a snapshot file is always complete
+    finally:
+        src.close()
+    if prune:
+        prune_snapshots()
+    return path
+
+
+def prune_snapshots(keep=RETENTION, keep_labelled=LABELLED_RETENTION):
+    """Deletes all but the newest `keep` snapshots of the chain and `keep_labelled` of each label.
+
+    Older snapshots that a kept delta is built on are kept too. Returns the deleted paths.
+    """
+    history = _history()
+    first = max(len(history) - keep, 0)
+    while first > 0 and _is_delta(history[first][3]):
+        first -= 1
+    deleted = [path for _, _, _, path in history[:first]]
+    labelled = {}
+    for snapshot in list_snapshots():
+        if snapshot[2] is not None:
+            labelled.setdefault(snapshot[2], []).append(snapshot[3])
+    for paths in labelled.values():
+        deleted += paths[:max(len(paths) - keep_labelled, 0)]
+    for path in deleted:
+        os.remove(path)
+    return deleted
+
+
+# --- RESTORE ---
+def _bump_versions(conn, before):
+    # Restored counters may repeat values already seen (and cached) by open pages;
+    # move every counter past both histories so each page re-reads.
+    for table in VERSIONED_TABLES:
+        after = conn.execute("SELECT version FROM table_versions WHERE table_name = ?", (table,)).fetchone()
+        version = max(before.get(table, 0), after[0] if after else 0) + 1
+        conn.execute("UPDATE table_versions SET version = ? WHERE table_name = ?", (version, table))
+
+
+def _reset_caches():
+    from utils.streaks import reset_streak_engine
+    from utils.moods import refresh_latest_mood
+    reset_streak_engine()
+    refresh_latest_mood()
+
+
+def _require(path):
+    # ATTACH and connect would silently create an empty database instead.
+    if not os.path.isfile(path):
+        raise FileNotFoundError(f"Snapshot {path} no longer exists")
+
+
+def _materialize(path, workdir):
+    """Builds the full database a snapshot stands for in `workdir`; returns its path."""
+    base_path, deltas = path, []
+    if _is_delta(path):
+        chain = [snapshot[3] for snapshot in _history()]
+        end = chain.index(path)
+        base = max(i for i in range(end + 1) if not _is_delta(chain[i]))
+        base_path, deltas = chain[base], chain[base + 1:end + 1]
+    full = os.path.join(workdir, "restore.db")
+    shutil.copyfile(base_path, full)
+    conn = sqlite3.connect(full, isolation_level=None)
+    try:
+        # Applying a delta would otherwise fire the version triggers once per row.
+        triggers = conn.execute("SELECT name, sql FROM sqlite_master WHERE type = 'trigger' AND name LIKE 'trg_%_version'").fetchall()
+        for name, _ in triggers:
+            conn.execute(f"DROP TRIGGER {name}")
+        for delta in deltas:
+            conn.execute("ATTACH DATABASE ? AS delta", (delta,))
+            conn.execute("BEGIN")
+            existing = set(_tables(conn, "main"))
+            for table in _tables(conn, "delta"):
+                if table in existing:
+                    columns = ", ".join(d[0] for d in conn.execute(f"SELECT * FROM delta.{table} WHERE 1 = 0").description)
+                    conn.execute(f"DELETE FROM main.{table}")
+                    conn.execute(f"INSERT INTO main.{table} ({columns}) SELECT {columns} FROM delta.{table}")
+                else:
+                    conn.execute(f"CREATE TABLE main.{table} AS SELECT * FROM delta.{table}")
+            conn.execute("COMMIT")
+            conn.execute("DETACH DATABASE delta")
+        for table, year in conn.execute("SELECT table_name, year FROM archive_partitions").fetchall():
+            name = f"{table}_{int(year)}"
+            conn.execute(f"CREATE INDEX IF NOT EXISTS idx_{name}_date ON {name} (date)")
+        conn.execute(f"DROP TABLE IF EXISTS {MANIFEST}")
+        for _, sql in triggers:
+            conn.execute(sql)
+    finally:
+        conn.close()
+    return full
+
+
+def restore_snapshot(path):
+    """Replaces the whole live database with a snapshot, after snapshotting the current state."""
+    backend = _sqlite_backend()
+    _require(path)
+    workdir = tempfile.mkdtemp(prefix="study_companion_restore_")
+    try:
+        full = _materialize(path, workdir)
+        # Not pruned yet: that could delete the very snapshot being restored.
+        safety = create_snapshot(label="before-restore", prune=False)
+        live = _connect(backend)
+        try:
+            before = dict(live.execute("SELECT table_name, version FROM table_versions").fetchall())
+            snapshot = sqlite3.connect(full)
+            try:
+                snapshot.backup(live, pages=PAGES_PER_STEP, sleep=STEP_SLEEP)
+            finally:
+                snapshot.close()
+            _bump_versions(live, before)
+            live.commit()
+        finally:
+            live.close()
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+    set_backend(backend)  # re-run migrations in case the snapshot predates some of them
+    _reset_caches()
+    prune_snapshots()
+    return safety
+
+
+def restore_to(when):
+    """Restores the newest snapshot taken at or before `when` (a datetime); returns its path."""
+    candidates = [s for s in list_snapshots() if s[0] <= when]
+    if not candidates:
+        raise ValueError(f"No snapshot was taken at or before {when}")
+    path = candidates[-1][3]
+    restore_snapshot(path)
+    return path
+
+
+def restore_tables(path, tables):
+    """Copies `tables` back from a snapshot or undo copy in one transaction, leaving every other table as it is."""
+    backend = _sqlite_backend()
+    _require(path)
+    conn = _connect(backend)
+    try:
+        conn.execute("ATTACH DATABASE ? AS snapshot", (path,))
+        with conn:
+            for table in tables:
+                columns = ", ".join(d[0] for d in conn.execute(f"SELECT * FROM main.{table} WHERE 1 = 0").description)
+                conn.execute(f"DELETE FROM main.{table}")
+                conn.execute(f"INSERT INTO main.{table} ({columns}) SELECT {columns} FROM snapshot.{table}")
+        conn.execute("DETACH DATABASE snapshot")
+    finally:
+        conn.close()
+    _reset_caches()
+
+
+# --- UNDO OF SCHEDULE SAVES ---
+def undo_dir():
+    return os.path.join(backup_dir(), "undo")
+
+
+def snapshot_before_save():
+    """Copies just the schedule tables ahead of `save_schedule`; returns the path to undo with, or None.
+
+    These copies are kept apart from the snapshot history, with their own retention.
+    """
+    try:
+        backend = _sqlite_backend()
+    except RuntimeError:
+        return None
+    os.makedirs(undo_dir(), exist_ok=True)
+    path = os.path.join(undo_dir(), f"undo-{datetime.datetime.now():%Y%m%dT%H%M%S.%f}.db")
+    conn = _connect(backend)
+    conn.isolation_level = None
+    try:
+        _copy_tables(conn, path + ".part", SCHEDULE_TABLES)
+    finally:
+        conn.close()
+    os.replace(path + ".part", path)
+    copies = sorted(name for name in os.listdir(undo_dir()) if _UNDO_NAME.match(name))
+    for name in copies[:max(len(copies) - UNDO_RETENTION, 0)]:
+        os.remove(os.path.join(undo_dir(), name))
+    return path
+
+
+def undo_save(path):
+    """Puts back the study sessions and plan summaries from a `snapshot_before_save` copy.
+
+    Raises FileNotFoundError when that copy was already pruned.
+    """
+    restore_tables(path, SCHEDULE_TABLES)
+
+
+# --- SCHEDULED SNAPSHOTS ---
+_scheduled = False
+_scheduled_lock = threading.Lock()
+
+
+def schedule_backup():
+    """Takes a snapshot in the background if the last one is older than the interval; checked once per process."""
+    global _scheduled
+    with _scheduled_lock:
+        if _scheduled:
+            return
+        _scheduled = True
+    if not isinstance(get_backend(), SQLiteBackend):
+        return
+    snapshots = list_snapshots()
+    if not snapshots or datetime.datetime.now() - snapshots[-1][0] >= datetime.timedelta(hours=BACKUP_INTERVAL_HOURS):
+        threading.Thread(target=create_snapshot, name="backup", daemon=True).start()
+
+
+# --- BENCHMARK ---
+def _synthetic_database(path, rows):
+    """Fills a fresh database with `rows` mood logs, habit completions and study sessions."""
+    backend = set_backend(SQLiteBackend(path))
+    days = [(datetime.date.today() - datetime.timedelta(days=i)).isoformat() for i in range(3650)]
+    subjects = ["Math", "Physics", "History", "Biology", "English"]
+    with backend.connection() as conn:
+        c = conn.cursor()
+        c.executemany("INSERT INTO habits (name) VALUES (?)", [(f"habit {i}",) for i in range(20)])
+        c.executemany("INSERT INTO mood_logs (date, mood_rating, journal_entry) VALUES (?, ?, ?)",
+                      ((random.choice(days), random.randint(1, 10), "synthetic entry " * 4) for _ in range(rows)))
+        c.executemany("INSERT INTO study_sessions (date, subject, duration_minutes, notes) VALUES (?, ?, ?, ?)",
+                      ((random.choice(days), random.choice(subjects), random.randint(15, 120), "") for _ in range(rows)))
+        c.executemany("INSERT INTO habit_completions (habit_id, date) VALUES (?, ?) ON CONFLICT (habit_id, date) DO NOTHING",
+                      ((random.randint(1, 20), random.choice(days)) for _ in range(rows)))
+    return backend
+
+
+def _page_query(conn):
+    """The Dashboard's 30-day study breakdown and mood average."""
+    since = (datetime.date.today() - datetime.timedelta(days=30)).isoformat()
+    conn.execute("SELECT subject, SUM(duration_minutes) FROM study_sessions WHERE date >= ? GROUP BY subject", (since,)).fetchall()
+    conn.execute("SELECT AVG(mood_rating) FROM mood_logs WHERE date >= ?", (since,)).fetchall()
+
+
+def _measure_latency(backend, stop):
+    latencies = []
+    conn = _connect(backend)
+    while not stop.is_set():
+        start = time.perf_counter()
+        _page_query(conn)
+        latencies.append(time.perf_counter() - start)
+    conn.close()
+    return latencies
+
+
+def _percentiles(latencies):
+    ms = np.array(latencies) * 1000
+    return f"p50 {np.percentile(ms, 50):.1f} ms, p95 {np.percentile(ms, 95):.1f} ms, max {ms.max():.1f} ms ({len(ms)} queries)"
+
+
+def benchmark(rows):
+    """Measures snapshot duration and concurrent page-query latency on a large synthetic database."""
+    workdir = tempfile.mkdtemp(prefix="study_companion_backup_")
+    os.environ[BACKUP_DIR_ENV] = os.path.join(workdir, "backups")
+    backend = _synthetic_database(os.path.join(workdir, "large.db"), rows)
+    print(f"Synthetic database: {rows} rows per table, {os.path.getsize(backend.path) / 2**20:.0f} MiB")
+
+    def run(action=None, duration=3.0):
+        # Repeats `action` for at least `duration` seconds while a reader thread runs page queries.
+        stop, result, timings = threading.Event(), {}, []
+        reader = threading.Thread(target=lambda: result.setdefault('latencies', _measure_latency(backend, stop)))
+        reader.start()
+        started = time.perf_counter()
+        while time.perf_counter() - started < duration:
+            if action is None:
+                time.sleep(0.1)
+                continue
+            step = time.perf_counter()
+            action()
+            timings.append(time.perf_counter() - step)
+        stop.set()
+        reader.join()
+        return timings, result['latencies']
+
+    try:
+        _, idle = run()
+        print(f"Page queries, no backup running: {_percentiles(idle)}")
+        for pages in (PAGES_PER_STEP, -1):
+            timings, during = run(lambda: create_snapshot(force=True, pages=pages))
+            steps = f"{pages} pages/step" if pages > 0 else "single step"
+            print(f"Snapshot, {steps}: {np.mean(timings):.2f}s each; page queries meanwhile: {_percentiles(during)}")
+
+        # Deltas copy whole changed tables, so they rely on archival keeping the hot tables small.
+        from utils.archive import archive_old_rows
+        archive_old_rows()
+
+        def log_and_snapshot():
+            backend.execute("INSERT INTO mood_logs (date, mood_rating) VALUES (?, ?)", (datetime.date.today().isoformat(), 5))
+            create_snapshot()
+        timings, during = run(log_and_snapshot)
+        # Median: every FULL_EVERY-th of these is a full copy.
+        print(f"Delta snapshot after one mood log (older rows archived): {np.median(timings):.3f}s each; page queries meanwhile: {_percentiles(during)}")
+        timings, during = run(lambda: restore_snapshot(list_snapshots()[0][3]))
+        print(f"Restore: {np.mean(timings):.2f}s each; page queries meanwhile: {_percentiles(during)}")
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Snapshot and restore the Study Companion database")
+    commands = parser.add_subparsers(dest="command", required=True)
+    snapshot = commands.add_parser("snapshot", help="take a snapshot now")
+    snapshot.add_argument("--force", action="store_true", help="even if nothing changed since the last one")
+    commands.add_parser("list", help="list snapshots")
+    restore = commands.add_parser("restore", help="restore the newest snapshot taken at or before a time")
+    restore.add_argument("--at", required=True, help='e.g. "2026-10-19 08:00"')
+    bench = commands.add_parser("benchmark", help="measure backups on a synthetic database")
+    bench.add_argument("--rows", type=int, default=500_000)
+    args = parser.parse_args()
+
+    if args.command == "snapshot":
+        print(create_snapshot(force=args.force))
+    elif args.command == "list":
+        for taken_at, version, label, path in list_snapshots():
+            kind = "delta" if _is_delta(path) else "full"
+            print(f"{taken_at:%Y-%m-%d %H:%M:%S}  v{version:<8} {kind:<6} {label or '':<22} {path}")
+    elif args.command == "restore":
+        print(f"Restored {restore_to(datetime.datetime.fromisoformat(args.at))}")
+    else:
+        benchmark(args.rows)
+
+
+if __name__ == "__main__":
+    main()
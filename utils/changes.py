@@ -0,0 +1,17 @@
+from utils.storage import get_backend
+
+
+def table_versions():
+    """Returns {table: version} for every versioned table, in one tiny query.
+
+    A table's version goes up (via triggers) whenever any session or process
+    writes to it, so comparing two snapshots tells which tables changed.
+    """
+    df = get_backend().read_sql("SELECT table_name, version FROM table_versions")
+    return dict(zip(df['table_name'], df['version'].astype(int).tolist()))
+
+
+def changed_tables(before, after, tables=None):
+    """Returns the tables (optionally limited to `tables`) whose version differs between two snapshots."""
+    tables = after.keys() if tables is None else tables
+    return [table for table in tables if before.get(table) != after.get(table)]
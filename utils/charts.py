@@ -0,0 +1,151 @@
+import datetime
+
+import numpy as np
+import plotly.express as px
+import plotly.graph_objects as go
+
+from utils.archive import table_source
+
+# --- CALENDAR HEATMAPS ---
+# Each metric is one aggregated query (over its table and any archive partitions
+# the window reaches) returning at most one row per day.
+HEATMAP_QUERIES = {
+    'study': ('study_sessions', "SELECT date, SUM(duration_minutes) FROM {source} WHERE date BETWEEN ? AND ? GROUP BY date"),
+    'mood': ('mood_logs', "SELECT date, AVG(mood_rating) FROM {source} WHERE date BETWEEN ? AND ? GROUP BY date"),
+    'habit': ('habit_completions', "SELECT date, COUNT(*) FROM {source} WHERE date BETWEEN ? AND ? AND habit_id = ? GROUP BY date"),
+}
+
+
+def daily_values(backend, metric, start, end, habit_id=None):
+    """Returns a dense array with one value per day from `start` to `end` (NaN where nothing was logged)."""
+    params = (start.isoformat(), end.isoformat())
+    if metric == 'habit':
+        params += (int(habit_id),)
+    table, query = HEATMAP_QUERIES[metric]
+    query = query.format(source=table_source(table, start, end))
+    with backend.connection() as conn:
+        c = conn.cursor()
+        c.execute(backend.adapt(query), params)
+        rows = c.fetchall()
+
+    values = np.full((end - start).days + 1, np.nan)
+    if rows:
+        dates, totals = zip(*rows)
+        offsets = np.array([d[:10] for d in dates], dtype='datetime64[D]') - np.datetime64(start, 'D')
+        values[offsets.astype(np.int64)] = np.array(totals, dtype=float)
+    return values
+
+
+def calendar_heatmap(values, start, title="", colorscale="Greens", zmin=None, zmax=None, value_label="Value"):
+    """Draws a GitHub-style calendar (weeks as columns, weekdays as rows) as a single heatmap trace."""
+    offset = start.weekday()  # pad so that every column starts on a Monday
+    n_weeks = -(-(offset + len(values)) // 7)
+    grid = np.full(n_weeks * 7, np.nan)
+    grid[offset:offset + len(values)] = values
+
+    first_monday = np.datetime64(start, 'D') - offset
+    dates = (first_monday + np.arange(n_weeks * 7)).astype(str)
+
+    fig = go.Figure(go.Heatmap(
+        z=grid.reshape(n_weeks, 7).T,
+        x=(first_monday + np.arange(n_weeks) * 7).astype('datetime64[D]').astype(str),
+        y=["Mon", "Tue", "Wed", "Thu", "Fri", "Sat", "Sun"],
+        customdata=dates.reshape(n_weeks, 7).T,
+        hovertemplate=f"%{{customdata}}<br>{value_label}: %{{z}}<extra></extra>",
+        colorscale=colorscale,
+        zmin=zmin,
+        zmax=zmax,
+        xgap=3,
+        ygap=3,
+        hoverongaps=False,
+    ))
+    fig.update_layout(
+        title=title,
+        height=260,
+        margin=dict(l=40, r=20, t=40 if title else 10, b=20),
+        plot_bgcolor='rgba(0,0,0,0)',
+        paper_bgcolor='rgba(0,0,0,0)',
+        xaxis=dict(showgrid=False, tickformat="%b", dtick="M1", ticklabelmode="period"),
+        yaxis=dict(showgrid=False, autorange="reversed"),
+    )
+    return fig
+
+
+def year_heatmap(backend, metric, habit_id=None, end=None):
+    """Builds the year-long calendar heatmap for study minutes, mood or one habit."""
+    end = end or datetime.date.today()
+    start = end - datetime.timedelta(days=364)
+    values = daily_values(backend, metric, start, end, habit_id)
+    if metric == 'study':
+        return calendar_heatmap(values, start, colorscale="Blues", zmin=0, value_label="Minutes")
+    if metric == 'mood':
+        return calendar_heatmap(values, start, colorscale="RdYlGn", zmin=1, zmax=10, value_label="Mood")
+    return calendar_heatmap(values, start, colorscale="Greens", zmin=0, value_label="Completions")
+
+
+# --- DOWNSAMPLED LINE CHARTS ---
+# Hard cap on points drawn per trace, whatever the window.
+MAX_POINTS_PER_TRACE = 500
+
+# (longest window in days, resample rule). Short windows keep raw points.
+RESAMPLE_RULES = [
+    (31, None),
+    (180, 'D'),
+    (730, 'W-MON'),
+    (None, 'MS'),
+]
+
+
+def resample_rule(span_days):
+    """Picks the bucket size (a pandas offset alias, or None for raw points) for a window length."""
+    for max_days, rule in RESAMPLE_RULES:
+        if max_days is None or span_days <= max_days:
+            return rule
+
+
+def lttb(x, y, n_out):
+    """Largest-Triangle-Three-Buckets: returns the indices of `n_out` points that keep the series' shape."""
+    n = len(y)
+    if n_out >= n or n_out < 3:
+        return np.arange(n)
+
+    edges = np.linspace(1, n - 1, n_out - 1).astype(np.int64)
+    selected = np.empty(n_out, dtype=np.int64)
+    selected[0], selected[-1] = 0, n - 1
+    a = 0
+    for i in range(n_out - 2):
+        start, end = edges[i], edges[i + 1]
+        if i + 2 < len(edges):
+            next_start, next_end = edges[i + 1], edges[i + 2]
+        else:
+            next_start, next_end = n - 1, n
+        avg_x = x[next_start:next_end].mean()
+        avg_y = y[next_start:next_end].mean()
+        area = np.abs((x[a] - avg_x) * (y[start:end] - y[a]) - (x[a] - x[start:end]) * (avg_y - y[a]))
+        a = start + int(np.argmax(area))
+        selected[i + 1] = a
+    return selected
+
+
+def downsample(df, x, y, how='mean', max_points=MAX_POINTS_PER_TRACE):
+    """Resamples a time series into buckets suited to its span, then caps it at `max_points`."""
+    df = df[[x, y]].dropna().sort_values(x)
+    if df.empty:
+        return df
+
+    span_days = (df[x].iloc[-1] - df[x].iloc[0]).days + 1
+    rule = resample_rule(span_days)
+    if rule is not None:
+        series = df.set_index(x)[y].resample(rule, label='left', closed='left')
+        series = series.sum(min_count=1) if how == 'sum' else series.agg(how)
+        df = series.dropna().reset_index()
+
+    if len(df) > max_points:
+        xs = df[x].to_numpy().astype('datetime64[ns]').astype(np.int64).astype(float)
+        df = df.iloc[lttb(xs, df[y].to_numpy(dtype=float), max_points)]
+    return df
+
+
+def line_chart(df, x, y, how='mean', max_points=MAX_POINTS_PER_TRACE, **px_kwargs):
+    """`px.line` over a downsampled copy of the data, so long windows stay light in the browser."""
+    return px.line(downsample(df, x, y, how, max_points), x=x, y=y, **px_kwargs)
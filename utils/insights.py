@@ -0,0 +1,182 @@
+import os
+import json
+import random
+import hashlib
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor, TimeoutError
+
+# --- CONFIGURATION ---
+INSIGHT_MODEL_ENV = "STUDY_COMPANION_INSIGHT_MODEL"
+DEFAULT_INSIGHT_MODEL = "HuggingFaceTB/SmolLM2-135M-Instruct"
+# Hard limit (seconds) on how long a page waits for generated text.
+LATENCY_BUDGET = 2.0
+MAX_NEW_TOKENS = 60
+MAX_CACHED_INSIGHTS = 256
+
+# One worker: the model is shared by every session and generations run one at a time.
+_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="insights")
+_lock = threading.Lock()
+_model_future = None
+_cache = OrderedDict()
+_pending = {}
+
+
+def summarize_features(latest_mood, mood_avg_7d, habit_counts_7d, study_hours_7d):
+    """Reduces the user's recent data to a small, coarse feature dict (the cache key)."""
+    return {
+        'latest_mood': int(latest_mood),
+        'mood_avg_7d': round(float(mood_avg_7d)) if mood_avg_7d == mood_avg_7d else None,
+        'habits_7d': {name: int(count) for name, count in sorted(habit_counts_7d.items())},
+        'study_hours_7d': round(float(study_hours_7d)),
+    }
+
+
+def feature_key(features):
+    """Hashes a feature dict so identical situations share one cached insight."""
+    return hashlib.sha256(json.dumps(features, sort_keys=True).encode()).hexdigest()
+
+
+def build_prompt(features):
+    """Turns the summarized features into an instruction for the model."""
+    habits = ", ".join(f"{name} ({count}x)" for name, count in features['habits_7d'].items()) or "none tracked"
+    mood_avg = features['mood_avg_7d'] if features['mood_avg_7d'] is not None else "unknown"
+    return (
+        "You are a supportive study coach. Here is a student's last week:\n"
+        f"- Latest mood: {features['latest_mood']}/10 (weekly average: {mood_avg})\n"
+        f"- Habits completed: {habits}\n"
+        f"- Hours studied: {features['study_hours_7d']}\n"
+        "Give one short, specific and encouraging tip for today in at most two sentences."
+    )
+
+
+# --- MODEL ---
+def _load_model():
+    """Loads the text-generation model, dynamically quantized to int8 for CPU inference."""
+    import torch
+    from transformers import AutoModelForCausalLM, AutoTokenizer
+
+    name = os.environ.get(INSIGHT_MODEL_ENV, DEFAULT_INSIGHT_MODEL)
+    tokenizer = AutoTokenizer.from_pretrained(name)
+    model = AutoModelForCausalLM.from_pretrained(name)
+    model = torch.ao.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8)
+    model.eval()
+    return tokenizer, model
+
+
+def _model():
+    """Returns the (tokenizer, model) pair, or None while it is loading or if it failed to load."""
+    global _model_future
+    with _lock:
+        if _model_future is None:
+            _model_future = _executor.submit(_load_model)
+    if not _model_future.done() or _model_future.exception() is not None:
+        return None
+    return _model_future.result()
+
+
+def _generate(tokenizer, model, prompt):
+    import torch
+
+    if tokenizer.chat_template:
+        text = tokenizer.apply_chat_template([{"role": "user", "content": prompt}], tokenize=False, add_generation_prompt=True)
+    else:
+        text = prompt
+    inputs = tokenizer(text, return_tensors="pt")
+    with torch.inference_mode():
+        output = model.generate(
+            **inputs,
+            max_new_tokens=MAX_NEW_TOKENS,
+            max_time=LATENCY_BUDGET,
+            do_sample=False,
+            pad_token_id=tokenizer.eos_token_id,
+        )
+    return tokenizer.decode(output[0][inputs['input_ids'].shape[1]:], skip_special_tokens=True).strip()
+
+
+def _remember(key, text):
+    with _lock:
+        _pending.pop(key, None)
+        if text:
+            _cache[key] = text
+            _cache.move_to_end(key)
+            while len(_cache) > MAX_CACHED_INSIGHTS:
+                _cache.popitem(last=False)
+
+
+def _generate_and_cache(key, tokenizer, model, prompt):
+    try:
+        text = _generate(tokenizer, model, prompt)
+    except Exception:
+        text = None
+    _remember(key, text)
+    return text
+
+
+# --- PUBLIC API ---
+def generate_insight(features, fallback):
+    """Returns a model-written tip for `features`, or `fallback` if none is ready within the latency budget.
+
+    A generation that overruns the budget keeps going in the background and
+    is cached, so the next visit with the same situation gets it instantly.
+    """
+    key = feature_key(features)
+    with _lock:
+        if key in _cache:
+            _cache.move_to_end(key)
+            return _cache[key]
+        future = _pending.get(key)
+
+    if future is None:
+        loaded = _model()
+        if loaded is None:
+            return fallback
+        with _lock:
+            future = _pending.get(key)
+            if future is None:
+                future = _pending[key] = _executor.submit(_generate_and_cache, key, *loaded, build_prompt(features))
+
+    try:
+        return future.result(timeout=LATENCY_BUDGET) or fallback
+    except TimeoutError:
+        return fallback
+
+
+# --- INSIGHT TEXT ---
+def generate_rule_based_insight(df_mood, df_habits, df_completions):
+    """Generates a personalized insight based on mood and habit data."""
+    
+    # Get the latest mood rating
+    latest_mood = df_mood['mood_rating'].iloc[0] if not df_mood.empty else 0
+    
+    # Get a list of all habits
+    habits = df_habits['name'].tolist() if not df_habits.empty else []
+
+    if latest_mood >= 8:
+        return f"You're doing great with a mood of {latest_mood}/10! Keep up the good work and stay positive."
+    elif latest_mood >= 4:
+        motivational_quotes = [
+            "The secret of getting ahead is getting started.",
+            "The best way to predict the future is to create it.",
+            "Don't watch the clock; do what it does. Keep going.",
+            "The future belongs to those who believe in the beauty of their dreams."
+        ]
+        return f"It looks like your mood is a bit low today at {latest_mood}/10. Here's some motivation: '{random.choice(motivational_quotes)}'"
+    else:
+        if habits:
+            suggested_habit = random.choice(habits)
+            return f"Your mood is quite low today. Your Smart Companion suggests focusing on a habit to feel better. How about '{suggested_habit}'?"
+        else:
+            return "Your mood is quite low today. Please add a habit in the Daily Tracker page to get a suggestion."
+
+
+def generate_ai_insight(df_mood, df_habits, df_completions, mood_avg_7d, study_hours_7d):
+    """Asks the local model for a personalized tip, falling back to the rule-based insight."""
+    fallback = generate_rule_based_insight(df_mood, df_habits, df_completions)
+    features = summarize_features(
+        df_mood['mood_rating'].iloc[0] if not df_mood.empty else 0,
+        mood_avg_7d,
+        dict(zip(df_completions['name'], df_completions['count'])),
+        study_hours_7d,
+    )
+    return generate_insight(features, fallback)
@@ -0,0 +1,39 @@
+import streamlit as st
+
+from utils.storage import get_backend
+from utils.changes import table_versions, changed_tables
+
+# How often open pages check the version counters for writes made elsewhere.
+POLL_SECONDS = 5
+
+
+def refresh_versions():
+    """Snapshots the table versions for this run; call once at the top of a live page."""
+    st.session_state.table_versions = table_versions()
+    return st.session_state.table_versions
+
+
+@st.cache_data(show_spinner=False, max_entries=256)
+def _read_sql(query, params, versions):
+    # `versions` is only part of the cache key: a new version means a new entry.
+    return get_backend().read_sql(query, params=params)
+
+
+def versions_of(*tables):
+    """The snapshotted versions of `tables`, for use as a cache key."""
+    versions = st.session_state.get('table_versions') or refresh_versions()
+    return tuple(versions.get(table, 0) for table in tables)
+
+
+def live_read_sql(tables, query, params=()):
+    """`read_sql` served from cache until one of the `tables` it reads gets a new version."""
+    return _read_sql(query, tuple(params), versions_of(*tables))
+
+
+@st.fragment(run_every=POLL_SECONDS)
+def watch_tables(tables):
+    """Polls the version counters and reruns the page once any of `tables` changed in another session."""
+    current = table_versions()
+    if changed_tables(st.session_state.get('table_versions', {}), current, tables):
+        st.session_state.table_versions = current
+        st.rerun()
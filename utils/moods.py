@@ -0,0 +1,57 @@
+import datetime
+
+from utils.storage import get_backend, epoch_now
+from utils.archive import table_source
+
+
+def describe_mood(mood_value):
+    """Maps a 1-10 mood rating to its (emoji, label)."""
+    if mood_value <= 2:
+        return "😢", "Very Sad"
+    elif mood_value <= 4:
+        return "😞", "Sad"
+    elif mood_value <= 6:
+        return "😐", "Neutral"
+    elif mood_value <= 8:
+        return "🙂", "Happy"
+    elif mood_value == 9:
+        return "😄", "Very Happy"
+    else:  # mood_value == 10
+        return "🤩", "Excited"
+
+
+def log_mood(mood_rating, mood_label, mood_emoji, journal_entry):
+    """Logs the user's mood to the database and makes it the latest mood."""
+    date, now = datetime.date.today().isoformat(), epoch_now()
+    backend = get_backend()
+    with backend.connection() as conn:
+        c = conn.cursor()
+        c.execute(backend.adapt(
+            "INSERT INTO mood_logs (date, logged_at, mood_rating, mood_label, mood_emoji, journal_entry) VALUES (?, ?, ?, ?, ?, ?)"
+        ), (date, now, mood_rating, mood_label, mood_emoji, journal_entry))
+        c.execute(backend.adapt("""
+            INSERT INTO latest_mood (slot, date, logged_at, mood_rating, journal_entry) VALUES (1, ?, ?, ?, ?)
+            ON CONFLICT (slot) DO UPDATE SET date = excluded.date, logged_at = excluded.logged_at,
+                mood_rating = excluded.mood_rating, journal_entry = excluded.journal_entry
+        """), (date, now, mood_rating, journal_entry))
+
+
+def load_latest_mood():
+    """Returns the most recent mood log (date, mood_rating, journal_entry) as a 0- or 1-row DataFrame."""
+    return get_backend().read_sql("SELECT date, mood_rating, journal_entry FROM latest_mood WHERE slot = 1")
+
+
+def refresh_latest_mood():
+    """Recomputes the latest-mood pointer after mood logs were edited or deleted.
+
+    Archived logs count too, so the pointer survives the hot table emptying out.
+    """
+    source = table_source('mood_logs')
+    with get_backend().connection() as conn:
+        c = conn.cursor()
+        c.execute("DELETE FROM latest_mood")
+        c.execute(f"""
+            INSERT INTO latest_mood (slot, date, logged_at, mood_rating, journal_entry)
+            SELECT 1, date, logged_at, mood_rating, journal_entry FROM {source}
+            ORDER BY date DESC, COALESCE(logged_at, 0) DESC, id DESC LIMIT 1
+        """)
@@ -0,0 +1,243 @@
+"""Batch weekly/monthly digests (HTML or PDF) built from the same computations as the Dashboard.
+
+    python -m utils.reports --period week --count 12
+    python -m utils.reports --period month --count 6 --format pdf --db sqlite:///alice.db --db sqlite:///bob.db
+    python -m utils.reports --count 52 --benchmark      # reports/second, one worker vs the pool
+"""
+import os
+import io
+import math
+import html
+import base64
+import random
+import argparse
+import datetime
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import matplotlib
+matplotlib.use("Agg")  # render to files; no display needed
+import matplotlib.pyplot as plt
+from matplotlib.backends.backend_pdf import PdfPages
+from matplotlib.ticker import PercentFormatter
+
+from utils.storage import backend_from_url, database_url, get_backend, set_backend
+from utils.summaries import study_hours_by_subject, study_hours_by_date, habit_counts, load_period
+from utils.insights import generate_rule_based_insight
+
+PERIODS = ('week', 'month')
+DEFAULT_OUTPUT_DIR = "reports"
+
+
+def period_starts(period, count, today=None):
+    """Start dates of the last `count` weeks (Mondays) or months, oldest first, including the current one."""
+    today = today or datetime.date.today()
+    if period == 'week':
+        this_week = today - datetime.timedelta(days=today.weekday())
+        return [this_week - datetime.timedelta(weeks=i) for i in reversed(range(count))]
+    starts = []
+    year, month = today.year, today.month
+    for _ in range(count):
+        starts.append(datetime.date(year, month, 1))
+        year, month = (year, month - 1) if month > 1 else (year - 1, 12)
+    return starts[::-1]
+
+
+def period_end(period, start):
+    if period == 'week':
+        return start + datetime.timedelta(days=6)
+    next_month = (start.replace(day=28) + datetime.timedelta(days=4)).replace(day=1)
+    return next_month - datetime.timedelta(days=1)
+
+
+# --- DIGEST CONTENT ---
+def build_digest(backend, start, end):
+    """Computes the figures of one digest for the days `start`..`end`."""
+    data = load_period(backend, start.isoformat(), end.isoformat())
+    # Rates of the current, unfinished period are over the days so far.
+    days = (min(end, datetime.date.today()) - start).days + 1
+    study, mood = data['study'], data['mood']
+    habits = habit_counts(data['habits'], data['completions'])
+    habits['rate'] = habits['count'] / days
+    mood_by_day = mood.assign(date=mood['date'].str[:10]).groupby('date')['mood_rating'].mean()
+    return {
+        'start': start,
+        'end': end,
+        'study_by_subject': study_hours_by_subject(study).sort_values('duration_hours', ascending=False),
+        'study_by_date': study_hours_by_date(study),
+        'total_hours': study['duration_minutes'].sum() / 60,
+        'mood_by_day': mood_by_day,
+        'average_mood': mood['mood_rating'].mean() if not mood.empty else None,
+        'habits': habits,
+        'insight': generate_rule_based_insight(mood, data['habits'], habits[['name', 'count']]),
+    }
+
+
+def render_charts(digest):
+    """Draws each chart of a digest once; returns {title: matplotlib figure}."""
+    figures = {}
+    subjects = digest['study_by_subject']
+    if not subjects.empty:
+        fig, ax = plt.subplots(figsize=(6, 3))
+        ax.barh(subjects['subject'], subjects['duration_hours'], color='#5DADE2')
+        ax.invert_yaxis()
+        ax.set_xlabel("Hours")
+        fig.subplots_adjust(left=0.25, right=0.95, bottom=0.18, top=0.88)
+        figures["Study hours by subject"] = fig
+    mood = digest['mood_by_day']
+    if not mood.empty:
+        fig, ax = plt.subplots(figsize=(6, 2.5))
+        ax.plot(mood.index, mood.values, marker='o', color='#FF6347')
+        ax.set_ylim(1, 10)
+        ax.set_ylabel("Mood (1-10)")
+        ax.tick_params(axis='x', labelrotation=45, labelsize=7)
+        fig.subplots_adjust(left=0.12, right=0.97, bottom=0.3, top=0.88)
+        figures["Mood trend"] = fig
+    habits = digest['habits']
+    if not habits.empty:
+        fig, ax = plt.subplots(figsize=(6, 2.5))
+        ax.bar(habits['name'], habits['rate'], color='#4682B4')
+        ax.set_ylim(0, 1)
+        ax.yaxis.set_major_formatter(PercentFormatter(1.0))
+        ax.set_ylabel("Days completed")
+        fig.subplots_adjust(left=0.12, right=0.97, bottom=0.15, top=0.88)
+        figures["Habit completion rate"] = fig
+    # Fixed margins instead of tight_layout, which costs an extra full draw per figure.
+    return figures
+
+
+def _headline(digest):
+    mood = digest['average_mood']
+    return [
+        ("Hours studied", f"{digest['total_hours']:.1f}"),
+        ("Average mood", "–" if mood is None else f"{mood:.1f} / 10"),
+        ("Habit check-offs", str(int(digest['habits']['count'].sum()))),
+    ]
+
+
+def write_html(digest, figures, path):
+    images = []
+    for title, fig in figures.items():
+        buffer = io.BytesIO()
+        fig.savefig(buffer, format='png', dpi=100)
+        images.append(f"<h2>{html.escape(title)}</h2><img src=\"data:image/png;base64,{base64.b64encode(buffer.getvalue()).decode()}\">")
+    metrics = "".join(f"<div class=\"metric\"><span>{html.escape(name)}</span><b>{value}</b></div>" for name, value in _headline(digest))
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write(f"""<!DOCTYPE html>
+<html><head><meta charset="utf-8"><title>Study digest {digest['start']} – {digest['end']}</title>
+<style>
+body {{ font-family: sans-serif; max-width: 720px; margin: 2em auto; color: #222; }}
+.metric {{ display: inline-block; margin-right: 2em; }} .metric span {{ display: block; color: #666; font-size: .9em; }}
+.insight {{ background: #eef5fb; padding: 1em; border-radius: 6px; }} img {{ max-width: 100%; }}
+</style></head><body>
+<h1>Study digest: {digest['start']} – {digest['end']}</h1>
+{metrics}
+<p class="insight">{html.escape(digest['insight'])}</p>
+{"".join(images) or "<p>Nothing was logged in this period.</p>"}
+</body></html>
+""")
+
+
+def write_pdf(digest, figures, path):
+    with PdfPages(path) as pdf:
+        cover = plt.figure(figsize=(6, 3))
+        lines = [f"Study digest: {digest['start']} – {digest['end']}", ""]
+        lines += [f"{name}: {value}" for name, value in _headline(digest)]
+        lines += ["", digest['insight']]
+        cover.text(0.05, 0.95, "\n".join(lines), va='top', wrap=True, fontsize=10)
+        pdf.savefig(cover)
+        plt.close(cover)
+        for title, fig in figures.items():
+            fig.suptitle(title)
+            pdf.savefig(fig)
+
+
+# --- BATCH JOBS ---
+_database = None
+
+
+def _use_database(url):
+    """Points this worker process at `url`, keeping its connection open across jobs for the same database."""
+    global _database
+    if _database != url:
+        set_backend(backend_from_url(url, reuse_connections=True))
+        _database = url
+
+
+def _fresh_worker():
+    # A forked worker must not reuse a connection inherited from the parent.
+    global _database
+    _database = None
+
+
+def make_report(job):
+    """Renders one digest; `job` is (database URL, period, start date, format, output directory)."""
+    url, period, start, fmt, out_dir = job
+    _use_database(url)
+    random.seed(f"{url}|{period}|{start}")  # the same period always gets the same insight text
+    digest = build_digest(get_backend(), start, period_end(period, start))
+    figures = render_charts(digest)
+    path = os.path.join(out_dir, f"{period}_{start.isoformat()}.{fmt}")
+    try:
+        (write_pdf if fmt == 'pdf' else write_html)(digest, figures, path)
+    finally:
+        for fig in figures.values():
+            plt.close(fig)
+    return path
+
+
+def report_jobs(urls, period, count, fmt, out_dir):
+    jobs = []
+    for url in urls:
+        name = os.path.splitext(os.path.basename(url.rstrip('/')))[0] or "database"
+        db_dir = os.path.join(out_dir, name)
+        os.makedirs(db_dir, exist_ok=True)
+        jobs += [(url, period, start, fmt, db_dir) for start in period_starts(period, count)]
+    return jobs
+
+
+def available_cpus():
+    """CPUs this process may run on, which bounds what extra workers can gain."""
+    return len(os.sched_getaffinity(0)) if hasattr(os, 'sched_getaffinity') else os.cpu_count() or 1
+
+
+def run_jobs(jobs, workers):
+    """Renders every job with `workers` processes; returns (paths, seconds).
+
+    Rendering is CPU-bound, so a pool only pays off with a CPU per worker.
+    Each worker gets one contiguous chunk of jobs: the pool starts once and
+    a worker keeps its database connection for its run of periods.
+    """
+    started = time.perf_counter()
+    if workers == 1:
+        paths = [make_report(job) for job in jobs]
+    else:
+        with ProcessPoolExecutor(max_workers=workers, initializer=_fresh_worker) as pool:
+            paths = list(pool.map(make_report, jobs, chunksize=math.ceil(len(jobs) / workers)))
+    return paths, time.perf_counter() - started
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Render weekly or monthly study digests")
+    parser.add_argument("--db", action="append", help="database URL (repeatable; default: the app's database)")
+    parser.add_argument("--period", choices=PERIODS, default='week')
+    parser.add_argument("--count", type=int, default=4, help="number of most recent periods")
+    parser.add_argument("--format", choices=('html', 'pdf'), default='html')
+    parser.add_argument("--out", default=DEFAULT_OUTPUT_DIR, help="output directory")
+    parser.add_argument("--workers", type=int, default=available_cpus(), help="worker processes (at most one per available CPU)")
+    parser.add_argument("--benchmark", action="store_true", help="also time a single-process run for comparison")
+    args = parser.parse_args()
+
+    jobs = report_jobs(args.db or [database_url()], args.period, args.count, args.format, args.out)
+    workers = max(1, min(args.workers, available_cpus(), len(jobs)))
+    if workers < args.workers:
+        print(f"Using {workers} worker(s): more processes than CPUs (or jobs) only add overhead")
+    runs = [1, workers] if args.benchmark and workers > 1 else [workers]
+    for workers in runs:
+        paths, seconds = run_jobs(jobs, workers)
+        print(f"{len(paths)} reports with {workers} worker(s) in {seconds:.2f}s: {len(paths) / seconds:.1f} reports/second")
+    print(f"Written to {os.path.abspath(args.out)}")
+
+
+if __name__ == "__main__":
+    main()
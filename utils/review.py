@@ -0,0 +1,134 @@
+import datetime
+
+from utils.storage import get_backend
+
+# Schedule blocks for card reviews are labelled "Review: <subject>".
+REVIEW_PREFIX = "Review: "
+# Rough time one card review takes, used to turn due cards into study hours.
+REVIEW_MINUTES_PER_CARD = 0.5
+# Reviews never take more than this share of a day's study hours.
+MAX_REVIEW_SHARE = 0.5
+
+
+# --- SUBJECTS ---
+def load_subjects():
+    """Returns the saved subjects as `{name: difficulty}`."""
+    df = get_backend().read_sql("SELECT name, difficulty FROM subjects ORDER BY id")
+    return dict(zip(df['name'], df['difficulty'].astype(int)))
+
+
+def save_subject(name, difficulty):
+    """Adds a subject, or updates its difficulty if it already exists."""
+    get_backend().execute(
+        "INSERT INTO subjects (name, difficulty) VALUES (?, ?) "
+        "ON CONFLICT (name) DO UPDATE SET difficulty = excluded.difficulty",
+        (name, int(difficulty))
+    )
+
+
+def subject_ids():
+    """Returns the saved subjects as `{name: id}`."""
+    df = get_backend().read_sql("SELECT id, name FROM subjects")
+    return dict(zip(df['name'], df['id'].astype(int)))
+
+
+# --- SM-2 ---
+def sm2(easiness, interval_days, repetitions, quality):
+    """Applies one SM-2 review graded 0-5 and returns the new (easiness, interval_days, repetitions)."""
+    if quality >= 3:
+        if repetitions == 0:
+            interval_days = 1
+        elif repetitions == 1:
+            interval_days = 6
+        else:
+            interval_days = round(interval_days * easiness)
+        repetitions += 1
+    else:
+        repetitions = 0
+        interval_days = 1
+    easiness = max(1.3, easiness + 0.1 - (5 - quality) * (0.08 + (5 - quality) * 0.02))
+    return easiness, interval_days, repetitions
+
+
+# --- FLASHCARDS ---
+def add_card(subject_id, topic, front, back, due_date=None):
+    """Adds a flashcard, due for its first review today."""
+    due_date = (due_date or datetime.date.today()).isoformat()
+    get_backend().execute(
+        "INSERT INTO flashcards (subject_id, topic, front, back, due_date) VALUES (?, ?, ?, ?, ?)",
+        (int(subject_id), topic, front, back, due_date)
+    )
+
+
+def due_cards(limit=20, today=None):
+    """Returns the most overdue cards first; served by the index on `due_date`."""
+    today = (today or datetime.date.today()).isoformat()
+    return get_backend().read_sql("""
+        SELECT f.id, s.name AS subject, f.topic, f.front, f.back, f.due_date
+        FROM flashcards f
+        JOIN subjects s ON f.subject_id = s.id
+        WHERE f.due_date <= ?
+        ORDER BY f.due_date
+        LIMIT ?
+    """, params=(today, int(limit)))
+
+
+def due_count(today=None):
+    """Counts the cards due for review today (including overdue ones)."""
+    today = (today or datetime.date.today()).isoformat()
+    df = get_backend().read_sql("SELECT COUNT(*) AS n FROM flashcards WHERE due_date <= ?", params=(today,))
+    return int(df['n'].iloc[0])
+
+
+def review_card(card_id, quality, today=None):
+    """Records a review of a card graded 0-5 and schedules its next one."""
+    today = today or datetime.date.today()
+    backend = get_backend()
+    with backend.connection() as conn:
+        c = conn.cursor()
+        c.execute(backend.adapt("SELECT easiness, interval_days, repetitions FROM flashcards WHERE id = ?"), (int(card_id),))
+        row = c.fetchone()
+        if row is None:
+            return
+        easiness, interval_days, repetitions = sm2(*row, quality)
+        due_date = (today + datetime.timedelta(days=interval_days)).isoformat()
+        c.execute(
+            backend.adapt("UPDATE flashcards SET easiness = ?, interval_days = ?, repetitions = ?, due_date = ? WHERE id = ?"),
+            (easiness, interval_days, repetitions, due_date, int(card_id))
+        )
+
+
+# --- SCHEDULE INTEGRATION ---
+def weekly_review_hours(week_start, hours_per_day, today=None):
+    """Returns `{day_index: {subject: hours}}` of review time for the week starting on `week_start`.
+
+    Overdue cards land on today; cards due later in the week land on their due day.
+    """
+    today = today or datetime.date.today()
+    week_end = week_start + datetime.timedelta(days=6)
+    df = get_backend().read_sql("""
+        SELECT s.name AS subject, f.due_date, COUNT(*) AS cards
+        FROM flashcards f
+        JOIN subjects s ON f.subject_id = s.id
+        WHERE f.due_date <= ?
+        GROUP BY s.name, f.due_date
+    """, params=(week_end.isoformat(),))
+
+    minutes = {}
+    for subject, due_date, cards in df.itertuples(index=False):
+        day = max(datetime.date.fromisoformat(due_date[:10]), today)
+        day_index = (day - week_start).days
+        if 0 <= day_index < 7:
+            per_day = minutes.setdefault(day_index, {})
+            per_day[subject] = per_day.get(subject, 0) + cards * REVIEW_MINUTES_PER_CARD
+
+    review = {}
+    cap = hours_per_day * MAX_REVIEW_SHARE
+    for day_index, per_day in minutes.items():
+        total = sum(per_day.values()) / 60
+        scale = min(1, cap / total) if total else 0
+        hours = {subj: round(m / 60 * scale, 1) for subj, m in per_day.items()}
+        hours = {subj: h for subj, h in hours.items() if h >= 0.1}
+        if hours:
+            review[day_index] = hours
+    return review
@@ -0,0 +1,71 @@
+import datetime
+
+import pandas as pd
+
+from utils.storage import get_backend
+from utils.review import REVIEW_PREFIX
+
+DAYS = ["Monday", "Tuesday", "Wednesday", "Thursday", "Friday", "Saturday", "Sunday"]
+NON_STUDY = ["Other Activities", "Free Time"]
+
+
+def summarize_schedule(schedule):
+    """Returns the per-day and per-subject hour totals of a weekly schedule."""
+    rows = []
+    for day_index, day in enumerate(DAYS):
+        totals = {}
+        for subj, hrs in schedule.get(day, []):
+            totals[subj] = totals.get(subj, 0) + hrs
+        rows += [(day_index, day, subj, round(hrs, 1)) for subj, hrs in totals.items()]
+    day_totals = pd.DataFrame(rows, columns=['day_index', 'day', 'subject', 'hours'])
+    subject_totals = day_totals.groupby('subject', sort=False)['hours'].sum().round(1).reset_index()
+    return day_totals, subject_totals
+
+
+def schedule_from_day_totals(day_totals):
+    """Rebuilds a `{day: [(subject, hours), ...]}` schedule from its per-day totals."""
+    schedule = {day: [] for day in DAYS}
+    for day, subj, hrs in day_totals[['day', 'subject', 'hours']].itertuples(index=False):
+        schedule[day].append((subj, hrs))
+    return schedule
+
+
+def save_schedule(schedule, week_start=None):
+    """Saves a weekly schedule: its study sessions plus the materialized day/subject summaries."""
+    if week_start is None:
+        today = datetime.date.today()
+        week_start = today - datetime.timedelta(days=today.weekday())
+
+    day_totals, subject_totals = summarize_schedule(schedule)
+    sessions = []
+    for i, day_name in enumerate(DAYS):
+        current_date = (week_start + datetime.timedelta(days=i)).strftime('%Y-%m-%d')
+        for subj, hrs in schedule.get(day_name, []):
+            if subj.startswith(REVIEW_PREFIX): # Review blocks count as study time for their subject
+                sessions.append((current_date, subj[len(REVIEW_PREFIX):], int(hrs * 60), "Flashcard review"))
+            elif subj not in NON_STUDY: # Don't save non-study tasks
+                sessions.append((current_date, subj, int(hrs * 60), "")) # Convert hours to minutes
+
+    # Replace the previous saved schedule in one transaction to avoid duplicates
+    backend = get_backend()
+    with backend.connection() as conn:
+        c = conn.cursor()
+        c.execute("DELETE FROM study_sessions")
+        c.executemany(backend.adapt("INSERT INTO study_sessions (date, subject, duration_minutes, notes) VALUES (?, ?, ?, ?)"), sessions)
+        c.execute("DELETE FROM schedule_day_totals")
+        c.executemany(backend.adapt("INSERT INTO schedule_day_totals (day_index, day, subject, hours) VALUES (?, ?, ?, ?)"),
+                      [tuple(row) for row in day_totals.itertuples(index=False)])
+        c.execute("DELETE FROM schedule_subject_totals")
+        c.executemany(backend.adapt("INSERT INTO schedule_subject_totals (subject, hours) VALUES (?, ?)"),
+                      [tuple(row) for row in subject_totals.itertuples(index=False)])
+    return day_totals, subject_totals
+
+
+def load_schedule_summary():
+    """Reads the saved plan's per-day and per-subject totals, or None if nothing is saved."""
+    backend = get_backend()
+    day_totals = backend.read_sql("SELECT day_index, day, subject, hours FROM schedule_day_totals ORDER BY day_index")
+    if day_totals.empty:
+        return None
+    subject_totals = backend.read_sql("SELECT subject, hours FROM schedule_subject_totals")
+    return day_totals, subject_totals
@@ -0,0 +1,93 @@
+import time
+import datetime
+
+import numpy as np
+import pandas as pd
+import plotly.graph_objects as go
+
+from utils.storage import get_backend, days_ago
+from utils.archive import table_source
+
+WEEKDAYS = ["Mon", "Tue", "Wed", "Thu", "Fri", "Sat", "Sun"]
+# Look-back window and how many mood logs a slot needs before it can be recommended.
+SLOT_WINDOW_DAYS = 90
+MIN_SLOT_MOOD_LOGS = 2
+# Tables the slot statistics read, e.g. for `live_read_sql`'s cache key.
+SLOT_TABLES = ['mood_logs', 'habit_completions']
+
+# Entries are grouped into UTC quarter-hours in SQL: every time zone's offset
+# is a whole number of quarter-hours, so each bucket falls in one local hour.
+BUCKET_SECONDS = 900
+
+
+def _read_sql(tables, query, params):
+    return get_backend().read_sql(query, params=params)
+
+
+def slot_stats(days=SLOT_WINDOW_DAYS, read_sql=_read_sql):
+    """Average mood, mood logs and habit check-offs per local (weekday, hour).
+
+    One grouped query sums the entries per quarter-hour; each bucket is then
+    placed by its own local time, so entries on either side of a DST change
+    land in the right hour. Pages pass `live_read_sql` as `read_sql` to cache
+    the query until one of `SLOT_TABLES` changes.
+    """
+    start = days_ago(days)
+    since = int(time.mktime(datetime.date.fromisoformat(start).timetuple()))  # local midnight, stable all day
+    buckets = read_sql(SLOT_TABLES, f"""
+        SELECT logged_at / {BUCKET_SECONDS} AS bucket, SUM(mood_rating) AS mood_sum,
+               COUNT(mood_rating) AS mood_logs, COUNT(habit_id) AS habits_done
+        FROM (
+            SELECT logged_at, mood_rating, NULL AS habit_id
+            FROM {table_source('mood_logs', start)} WHERE logged_at >= ?
+            UNION ALL
+            SELECT logged_at, NULL AS mood_rating, habit_id
+            FROM {table_source('habit_completions', start)} WHERE logged_at >= ?
+        ) AS entries
+        GROUP BY logged_at / {BUCKET_SECONDS}
+    """, (since, since))
+    if buckets.empty:
+        return pd.DataFrame(columns=['weekday', 'hour', 'mood', 'mood_logs', 'habits_done'])
+    local = [datetime.datetime.fromtimestamp(int(bucket) * BUCKET_SECONDS) for bucket in buckets['bucket']]
+    buckets = buckets.assign(
+        weekday=[t.weekday() for t in local],
+        hour=[t.hour for t in local],
+        mood_sum=pd.to_numeric(buckets['mood_sum']).fillna(0),
+    )
+    stats = buckets.groupby(['weekday', 'hour'], as_index=False)[['mood_sum', 'mood_logs', 'habits_done']].sum()
+    stats['mood'] = stats['mood_sum'] / stats['mood_logs'].where(stats['mood_logs'] > 0)
+    return stats[['weekday', 'hour', 'mood', 'mood_logs', 'habits_done']]
+
+
+def recommend_slots(stats, n=3):
+    """Best study slots: highest average mood, then most habits done, among well-sampled slots."""
+    slots = stats[stats['mood_logs'] >= MIN_SLOT_MOOD_LOGS]
+    slots = slots.sort_values(['mood', 'habits_done'], ascending=False).head(n)
+    return [f"{WEEKDAYS[int(weekday)]} {int(hour):02d}:00" for weekday, hour in zip(slots['weekday'], slots['hour'])]
+
+
+def slot_heatmap(stats):
+    """Weekday x hour heatmap of average mood."""
+    grid = np.full((7, 24), np.nan)
+    if not stats.empty:
+        grid[stats['weekday'].astype(int), stats['hour'].astype(int)] = pd.to_numeric(stats['mood'], errors='coerce')
+    fig = go.Figure(go.Heatmap(
+        z=grid,
+        x=[f"{hour:02d}:00" for hour in range(24)],
+        y=WEEKDAYS,
+        colorscale="RdYlGn",
+        zmin=1,
+        zmax=10,
+        xgap=2,
+        ygap=2,
+        hoverongaps=False,
+        hovertemplate="%{y} %{x}<br>Average mood: %{z:.1f}<extra></extra>",
+    ))
+    fig.update_layout(
+        height=280,
+        margin=dict(l=40, r=20, t=10, b=20),
+        plot_bgcolor='rgba(0,0,0,0)',
+        paper_bgcolor='rgba(0,0,0,0)',
+        yaxis=dict(autorange="reversed"),
+    )
+    return fig
@@ -0,0 +1,306 @@
+import bisect
+import datetime
+import threading
+from collections import Counter
+
+import numpy as np
+import pandas as pd
+
+from utils.storage import get_backend, epoch_now
+from utils.archive import table_source
+
+# Rolling windows (in days) reported as completion rates.
+RATE_WINDOWS = (7, 30)
+TABLE = 'habit_completions'
+
+
+def to_day(value):
+    """Converts a date, timestamp or ISO string to an integer day number."""
+    return pd.Timestamp(value).date().toordinal()
+
+
+class _HabitHistory:
+    """Completion days of one habit, kept as sorted days plus maximal runs."""
+
+    def __init__(self):
+        self.counts = {}        # day -> number of completion rows on that day
+        self.days = []          # sorted distinct days
+        self.starts = []        # sorted run start days
+        self.run_end = {}       # run start -> run end
+        self.run_start = {}     # run end -> run start
+        self.lengths = Counter()
+
+    def _add_run(self, start, end):
+        bisect.insort(self.starts, start)
+        self.run_end[start] = end
+        self.run_start[end] = start
+        self.lengths[end - start + 1] += 1
+
+    def _remove_run(self, start):
+        end = self.run_end.pop(start)
+        del self.run_start[end]
+        del self.starts[bisect.bisect_left(self.starts, start)]
+        length = end - start + 1
+        self.lengths[length] -= 1
+        if not self.lengths[length]:
+            del self.lengths[length]
+
+    def _run_containing(self, day):
+        i = bisect.bisect_right(self.starts, day) - 1
+        if i >= 0 and self.run_end[self.starts[i]] >= day:
+            return self.starts[i], self.run_end[self.starts[i]]
+        return None
+
+    def add(self, day):
+        self.counts[day] = self.counts.get(day, 0) + 1
+        if self.counts[day] > 1:
+            return
+        bisect.insort(self.days, day)
+        start, end = day, day
+        if day - 1 in self.run_start:
+            start = self.run_start[day - 1]
+            self._remove_run(start)
+        if day + 1 in self.run_end:
+            end = self.run_end[day + 1]
+            self._remove_run(day + 1)
+        self._add_run(start, end)
+
+    def remove(self, day):
+        if day not in self.counts:
+            return
+        self.counts[day] -= 1
+        if self.counts[day]:
+            return
+        del self.counts[day]
+        del self.days[bisect.bisect_left(self.days, day)]
+        start, end = self._run_containing(day)
+        self._remove_run(start)
+        if start < day:
+            self._add_run(start, day - 1)
+        if day < end:
+            self._add_run(day + 1, end)
+
+    def current_streak(self, today):
+        """Length of the run ending today, or yesterday if today isn't done yet."""
+        run = self._run_containing(today) or self._run_containing(today - 1)
+        if run is None:
+            return 0
+        start, end = run
+        return min(end, today) - start + 1
+
+    def longest_streak(self):
+        return max(self.lengths) if self.lengths else 0
+
+    def completions_between(self, first, last):
+        return bisect.bisect_right(self.days, last) - bisect.bisect_left(self.days, first)
+
+
+class StreakEngine:
+    """Current/longest streaks and rolling completion rates for every habit.
+
+    History is loaded once with a single vectorized pass over
+    `habit_completions`; afterwards inserts and deletes update only the
+    affected habit's runs, so reading stats never re-scans the table.
+    `version` is the table's change counter the history is current with
+    (None once another writer got in between; see `get_streak_engine`).
+    """
+
+    def __init__(self, backend):
+        self.backend = backend
+        self._lock = threading.Lock()
+        self._habits = {}
+        self.version = None
+        self._load()
+
+    def _load(self):
+        # Read before the rows: a write in between only makes the version look stale.
+        self.version = _completions_version(self.backend)
+        df = self.backend.read_sql(f"SELECT habit_id, date FROM {table_source('habit_completions')}")
+        if df.empty:
+            return
+        df['day'] = pd.to_datetime(df['date']).values.astype('datetime64[D]').astype(np.int64)
+        counts = df.groupby(['habit_id', 'day']).size()
+        habit = counts.index.get_level_values('habit_id').to_numpy(np.int64)
+        day = counts.index.get_level_values('day').to_numpy(np.int64)
+        # Convert from days-since-epoch to the ordinals used by `to_day`.
+        day = day + datetime.date(1970, 1, 1).toordinal()
+
+        # A new run starts wherever the habit changes or a day is skipped.
+        new_run = np.ones(len(day), dtype=bool)
+        new_run[1:] = (habit[1:] != habit[:-1]) | (np.diff(day) != 1)
+        run_ids = np.cumsum(new_run) - 1
+        run_lengths = np.bincount(run_ids)
+        run_starts = day[new_run]
+        run_habits = habit[new_run]
+
+        bounds = np.flatnonzero(np.r_[True, habit[1:] != habit[:-1]])
+        for i, first in enumerate(bounds):
+            last = bounds[i + 1] if i + 1 < len(bounds) else len(day)
+            history = _HabitHistory()
+            history.days = day[first:last].tolist()
+            history.counts = dict(zip(history.days, counts.values[first:last].tolist()))
+            self._habits[int(habit[first])] = history
+        for habit_id, start, length in zip(run_habits.tolist(), run_starts.tolist(), run_lengths.tolist()):
+            history = self._habits[habit_id]
+            history.starts.append(start)
+            history.run_end[start] = start + length - 1
+            history.run_start[start + length - 1] = start
+            history.lengths[length] += 1
+
+    def wrote(self, c, rows, statements=1):
+        """Accounts for this process's own write to `habit_completions`, from inside its transaction.
+
+        Once the write holds its locks the version can only include committed
+        writes and this one; if it moved further, another writer got in.
+        """
+        c.execute(self.backend.adapt("SELECT version FROM table_versions WHERE table_name = ?"), (TABLE,))
+        version = c.fetchone()[0]
+        with self._lock:
+            expected = None if self.version is None else self.version + self.backend.version_bumps(rows, statements)
+            self.version = version if version == expected else None
+
+    def add(self, habit_id, date):
+        """Records one completion of `habit_id` on `date`."""
+        with self._lock:
+            self._habits.setdefault(int(habit_id), _HabitHistory()).add(to_day(date))
+
+    def remove(self, habit_id, date):
+        """Forgets one completion of `habit_id` on `date`."""
+        with self._lock:
+            history = self._habits.get(int(habit_id))
+            if history is not None:
+                history.remove(to_day(date))
+
+    def habit_stats(self, habit_id, today=None):
+        """Returns the streak and rate figures for a single habit."""
+        today = to_day(today or datetime.date.today())
+        with self._lock:
+            history = self._habits.get(int(habit_id)) or _HabitHistory()
+            stats = {
+                'current_streak': history.current_streak(today),
+                'longest_streak': history.longest_streak(),
+            }
+            for window in RATE_WINDOWS:
+                done = history.completions_between(today - window + 1, today)
+                stats[f'rate_{window}d'] = done / window
+        return stats
+
+    def stats(self, habit_ids, today=None):
+        """Returns a DataFrame of streak and rate figures indexed by habit id."""
+        rows = {int(habit_id): self.habit_stats(habit_id, today) for habit_id in habit_ids}
+        columns = ['current_streak', 'longest_streak'] + [f'rate_{w}d' for w in RATE_WINDOWS]
+        return pd.DataFrame.from_dict(rows, orient='index', columns=columns)
+
+
+def _completions_version(backend):
+    df = backend.read_sql("SELECT version FROM table_versions WHERE table_name = ?", params=(TABLE,))
+    return None if df.empty else int(df['version'].iloc[0])
+
+
+_engine = None
+_engine_lock = threading.Lock()
+
+
+def get_streak_engine():
+    """Returns the process-wide streak engine for the current storage backend.
+
+    The engine is reloaded when `habit_completions` changed in a way it was
+    not told about: a write by the API, another app node or a restore.
+    """
+    global _engine
+    backend = get_backend()
+    with _engine_lock:
+        if _engine is None or _engine.backend is not backend or _engine.version != _completions_version(backend):
+            _engine = StreakEngine(backend)
+    return _engine
+
+
+def reset_streak_engine():
+    """Drops the cached engine so the next use reloads all history (e.g. after a restore)."""
+    global _engine
+    with _engine_lock:
+        _engine = None
+
+
+# --- WRITES THAT KEEP STREAKS IN SYNC ---
+# Each write fetches the engine *before* touching the table, so an engine
+# created by that call never loads the row it is about to be told about.
+def complete_habit(habit_id, date):
+    """Inserts a habit completion and updates the streak engine."""
+    engine = get_streak_engine()
+    date = pd.Timestamp(date).strftime('%Y-%m-%d')
+    backend = get_backend()
+    with backend.connection() as conn:
+        c = conn.cursor()
+        c.execute(backend.adapt("INSERT INTO habit_completions (habit_id, date, logged_at) VALUES (?, ?, ?)"), (int(habit_id), date, epoch_now()))
+        engine.wrote(c, c.rowcount)
+    engine.add(habit_id, date)
+
+
+def _completion(completion_id):
+    df = get_backend().read_sql("SELECT habit_id, date FROM habit_completions WHERE id = ?", params=(int(completion_id),))
+    return None if df.empty else (int(df['habit_id'].iloc[0]), df['date'].iloc[0])
+
+
+def delete_completion(completion_id):
+    """Deletes a habit completion row and updates the streak engine."""
+    engine = get_streak_engine()
+    old = _completion(completion_id)
+    backend = get_backend()
+    with backend.connection() as conn:
+        c = conn.cursor()
+        c.execute(backend.adapt("DELETE FROM habit_completions WHERE id = ?"), (int(completion_id),))
+        engine.wrote(c, c.rowcount)
+    if old is not None:
+        engine.remove(*old)
+
+
+def update_completion_date(completion_id, new_date):
+    """Moves a habit completion to another date and updates the streak engine."""
+    engine = get_streak_engine()
+    old = _completion(completion_id)
+    new_date = pd.Timestamp(new_date).strftime('%Y-%m-%d')
+    backend = get_backend()
+    with backend.connection() as conn:
+        c = conn.cursor()
+        c.execute(backend.adapt("UPDATE habit_completions SET date = ? WHERE id = ?"), (new_date, int(completion_id)))
+        engine.wrote(c, c.rowcount)
+    if old is not None:
+        engine.remove(*old)
+        engine.add(old[0], new_date)
+
+
+def save_habit_checklist(completed, cleared=()):
+    """Writes a batch of habit check-offs in one transaction and updates the streak engine.
+
+    `completed` and `cleared` are iterables of `(habit_id, date)`. Completions
+    that are already logged are skipped by `ON CONFLICT DO NOTHING`; only the
+    rows each statement actually inserted or deleted (per `RETURNING`) reach
+    the engine, so a concurrent save of the same cell is never counted twice.
+    Returns the number of completions added and removed.
+    """
+    completed = {(int(h), pd.Timestamp(d).strftime('%Y-%m-%d')) for h, d in completed}
+    cleared = {(int(h), pd.Timestamp(d).strftime('%Y-%m-%d')) for h, d in cleared} - completed
+    if not completed and not cleared:
+        return 0, 0
+
+    engine = get_streak_engine()
+    backend = get_backend()
+    added, removed = [], []
+    with backend.connection() as conn:
+        c = conn.cursor()
+        now = epoch_now()
+        for habit_id, date in sorted(completed):
+            c.execute(backend.adapt("INSERT INTO habit_completions (habit_id, date, logged_at) VALUES (?, ?, ?) ON CONFLICT (habit_id, date) DO NOTHING RETURNING habit_id, date"),
+                      (habit_id, date, now))
+            added += c.fetchall()
+        for habit_id, date in sorted(cleared):
+            c.execute(backend.adapt("DELETE FROM habit_completions WHERE habit_id = ? AND date = ? RETURNING habit_id, date"), (habit_id, date))
+            removed += c.fetchall()
+        engine.wrote(c, len(added) + len(removed), len(completed) + len(cleared))
+
+    for habit_id, date in added:
+        engine.add(habit_id, date)
+    for habit_id, date in removed:
+        engine.remove(habit_id, date)
+    return len(added), len(removed)
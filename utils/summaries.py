@@ -0,0 +1,40 @@
+import pandas as pd
+
+from utils.archive import table_source
+
+
+# --- SHARED DASHBOARD/REPORT COMPUTATIONS ---
+def study_hours_by_subject(df_study):
+    """Total hours per subject from study session rows."""
+    hours = df_study['duration_minutes'] / 60
+    return df_study.assign(duration_hours=hours).groupby('subject')['duration_hours'].sum().reset_index()
+
+
+def study_hours_by_date(df_study):
+    """Total hours per day from study session rows."""
+    df = df_study.assign(date=pd.to_datetime(df_study['date']), duration_hours=df_study['duration_minutes'] / 60)
+    return df.groupby('date')['duration_hours'].sum().reset_index()
+
+
+def habit_counts(df_habits, df_completions):
+    """Completions per habit (0 for habits with none) from habits and per-habit `count` rows."""
+    df = pd.merge(df_habits, df_completions, left_on='id', right_on='habit_id', how='left').fillna(0)
+    df['count'] = df['count'].astype(int)
+    return df
+
+
+def load_period(backend, start, end):
+    """Reads everything a summary of the days `start`..`end` (ISO dates) needs."""
+    params = (start, end)
+    return {
+        'study': backend.read_sql(
+            f"SELECT date, subject, duration_minutes FROM {table_source('study_sessions', start, end)} WHERE date BETWEEN ? AND ? ORDER BY date",
+            params=params),
+        'mood': backend.read_sql(
+            f"SELECT date, mood_rating, journal_entry FROM {table_source('mood_logs', start, end)} WHERE date BETWEEN ? AND ? ORDER BY date DESC, COALESCE(logged_at, 0) DESC, id DESC",
+            params=params),
+        'habits': backend.read_sql("SELECT id, name FROM habits ORDER BY id"),
+        'completions': backend.read_sql(
+            f"SELECT habit_id, COUNT(date) AS count FROM {table_source('habit_completions', start, end)} WHERE date BETWEEN ? AND ? GROUP BY habit_id",
+            params=params),
+    }
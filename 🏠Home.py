@@ -1,7 +1,13 @@
 import streamlit as st
+from utils.archive import schedule_maintenance
+from utils.backup import schedule_backup
 
 st.set_page_config(page_title="Smart Study Companion", layout="wide")
 
+# Weekly archival of old rows plus VACUUM/ANALYZE, and a daily snapshot, in the background.
+schedule_maintenance()
+schedule_backup()
+
 st.title("The Smart Study Companion")
 st.write("Your personal assistant for smarter studying.")
 
@@ -113,3 +119,20 @@ with col4:
         """,
         unsafe_allow_html=True
     )
+
+st.markdown("---")
+
+# Row 3
+col5, col6 = st.columns(2)
+
+with col5:
+    st.markdown(
+        """
+        <a href="/Review" target="_self" class="nav-card">
+            <div class="nav-icon">🃏</div>
+            <div class="nav-label">Review</div>
+            <div class="nav-description">Revise flashcards with spaced repetition.</div>
+        </a>
+        """,
+        unsafe_allow_html=True
+    )